@@ -0,0 +1,353 @@
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.utils import (
+    add_user,
+    bulk_add_users,
+    get_permissions_model,
+    remove_user,
+)
+
+from example.users.models import Tenant, User
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = 'benchmark'
+
+    help = (
+        'Benchmark permission resolution and tenant membership checks and '
+        'print the results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            default=['2x100x5x20'],
+            metavar='TxUxGxP',
+            help=(
+                'Dataset sizes to benchmark, each given as the number of '
+                'tenants, users, groups per tenant, and permissions per '
+                'tenant separated by "x".'
+            ),
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=100,
+            help='Number of calls to measure per operation and size.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the random choices made while benchmarking.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results to this file instead of stdout.',
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'settings': {
+                    name: repr(getattr(settings, name))
+                    for name in dir(settings)
+                    if name.startswith('MULTI_TENANT_USERS_')
+                },
+            },
+            'sizes': [],
+        }
+
+        for size in options['sizes']:
+            try:
+                tenants, users, groups, permissions = (
+                    int(n) for n in size.split('x')
+                )
+            except ValueError:
+                raise CommandError('Invalid size "%s".' % size)
+
+            rng = random.Random(options['seed'])
+            dataset = self.create_dataset(
+                rng,
+                tenants,
+                users,
+                groups,
+                permissions,
+                options['iterations'],
+            )
+            results['sizes'].append({
+                'tenants': tenants,
+                'users': users,
+                'groups': groups,
+                'permissions': permissions,
+                'operations': self.run_operations(
+                    rng,
+                    dataset,
+                    options['iterations'],
+                ),
+            })
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def create_dataset(self, rng, tenants, users, groups, permissions, spare):
+        """
+        Creates or resets the benchmark tenants, users, groups, and
+        permissions. Every user belongs to every tenant, except for `spare`
+        extra users who are used to measure `add_user` and `remove_user`.
+        """
+        self.stderr.write(
+            'Preparing %d tenants, %d users, %d groups, and %d permissions...'
+            % (tenants, users, groups, permissions)
+        )
+        tenant_objs = []
+        for i in range(tenants):
+            schema_name = 'bench%d' % i
+            try:
+                tenant = Tenant.objects.get(schema_name=schema_name)
+            except Tenant.DoesNotExist:
+                tenant = Tenant(
+                    name='Benchmark %d' % i,
+                    domain_url='%s.local.bitsick.com' % schema_name,
+                    schema_name=schema_name,
+                )
+                tenant.save()
+            tenant_objs.append(tenant)
+
+        member_objs = self.get_users('bench_user_%d', users)
+        spare_objs = self.get_users('bench_spare_%d', spare)
+
+        PermissionsModel = get_permissions_model()
+        for tenant in tenant_objs:
+            bulk_add_users(member_objs, tenant)
+            with schema_context(tenant.schema_name):
+                PermissionsModel.objects.filter(
+                    user__in=spare_objs,
+                ).delete()
+                permissions_objs = list(PermissionsModel.objects.filter(
+                    user__in=member_objs,
+                ))
+                permission_objs = self.get_permissions(permissions)
+                group_objs = self.get_groups(groups, permission_objs, rng)
+                self.assign(
+                    rng,
+                    permissions_objs,
+                    group_objs,
+                    permission_objs,
+                )
+
+        for user in spare_objs:
+            user.tenants.remove(*tenant_objs)
+
+        return {
+            'tenants': tenant_objs,
+            'users': member_objs,
+            'spare': spare_objs,
+            'permissions': [
+                'data.%s' % permission.codename
+                for permission in permission_objs
+            ],
+        }
+
+    def get_users(self, username_format, count):
+        """Returns `count` users, creating any that don't exist yet."""
+        usernames = [username_format % i for i in range(count)]
+        existing = set(
+            User.objects
+            .filter(username__in=usernames)
+            .values_list('username', flat=True)
+        )
+        User.objects.bulk_create([
+            User(username=username, email='%s@example.com' % username)
+            for username in usernames
+            if username not in existing
+        ])
+        return list(User.objects.filter(username__in=usernames))
+
+    def get_permissions(self, count):
+        """
+        Returns `count` benchmark permissions in the current schema, creating
+        any that don't exist yet.
+        """
+        content_type = ContentType.objects.get_or_create(
+            app_label='data',
+            model='benchmark',
+        )[0]
+        return [
+            Permission.objects.get_or_create(
+                content_type=content_type,
+                codename='benchmark_%d' % i,
+                defaults={'name': 'Benchmark permission %d' % i},
+            )[0]
+            for i in range(count)
+        ]
+
+    def get_groups(self, count, permission_objs, rng):
+        """
+        Returns `count` benchmark groups in the current schema, each granted a
+        random half of `permission_objs`.
+        """
+        group_objs = []
+        for i in range(count):
+            group = Group.objects.get_or_create(name='Benchmark %d' % i)[0]
+            group.permissions.set(
+                rng.sample(permission_objs, len(permission_objs) // 2)
+            )
+            group_objs.append(group)
+        return group_objs
+
+    def assign(self, rng, permissions_objs, group_objs, permission_objs):
+        """
+        Resets the groups and direct permissions of `permissions_objs` to a
+        random selection and makes one in twenty of them superusers.
+        """
+        PermissionsModel = get_permissions_model()
+        groups_through = PermissionsModel.groups.through
+        perms_through = PermissionsModel.user_permissions.through
+        groups_field = PermissionsModel._meta.get_field('groups')
+        perms_field = PermissionsModel._meta.get_field('user_permissions')
+        owner = groups_field.m2m_column_name()
+        group_column = groups_field.m2m_reverse_name()
+        perm_column = perms_field.m2m_reverse_name()
+
+        ids = [obj.pk for obj in permissions_objs]
+        groups_through.objects.filter(**{'%s__in' % owner: ids}).delete()
+        perms_through.objects.filter(**{'%s__in' % owner: ids}).delete()
+
+        groups_rows = []
+        perms_rows = []
+        superusers = []
+        group_count = min(2, len(group_objs))
+        perm_count = min(3, len(permission_objs))
+        for obj in permissions_objs:
+            for group in rng.sample(group_objs, group_count):
+                groups_rows.append(groups_through(
+                    **{owner: obj.pk, group_column: group.pk}
+                ))
+            for perm in rng.sample(permission_objs, perm_count):
+                perms_rows.append(perms_through(
+                    **{owner: obj.pk, perm_column: perm.pk}
+                ))
+            if rng.random() < 0.05:
+                superusers.append(obj.pk)
+
+        groups_through.objects.bulk_create(groups_rows)
+        perms_through.objects.bulk_create(perms_rows)
+        PermissionsModel.objects.filter(pk__in=ids).update(is_superuser=False)
+        PermissionsModel.objects.filter(pk__in=superusers).update(
+            is_superuser=True,
+        )
+
+    def run_operations(self, rng, dataset, iterations):
+        """
+        Measures each benchmarked operation `iterations` times and returns the
+        summarized measurements by operation name.
+        """
+        tenants = dataset['tenants']
+        users = dataset['users']
+        perms = dataset['permissions']
+
+        def fresh_user():
+            # Simulates a new request by reloading the user.
+            return User.objects.get(pk=rng.choice(users).pk)
+
+        operations = {
+            'has_perm': lambda user, tenant: user.has_perm(rng.choice(perms)),
+            'get_all_permissions': (
+                lambda user, tenant: user.get_all_permissions()
+            ),
+            'is_superuser': lambda user, tenant: user.is_superuser,
+            'is_member_of': lambda user, tenant: user.is_member_of(tenant),
+        }
+
+        results = {}
+        for name, operation in sorted(operations.items()):
+            results[name] = self.measure(
+                lambda: (fresh_user(), rng.choice(tenants)),
+                operation,
+                iterations,
+            )
+
+        # add_user and remove_user are measured in pairs so that each user is
+        # added and removed again.
+        spare = list(dataset['spare'])
+        pairs = [(spare.pop(), rng.choice(tenants)) for _ in range(iterations)]
+        results['add_user'] = self.measure(
+            iter(pairs).__next__,
+            lambda user, tenant: add_user(user, tenant),
+            iterations,
+        )
+        results['remove_user'] = self.measure(
+            iter(pairs).__next__,
+            lambda user, tenant: remove_user(user, tenant),
+            iterations,
+        )
+        return results
+
+    def measure(self, prepare, operation, iterations):
+        """
+        Calls `operation(user, tenant)` `iterations` times inside the tenant's
+        schema, with arguments returned by `prepare()`, and returns its mean
+        number of queries, wall time percentiles, and peak memory usage.
+        """
+        queries = []
+        times = []
+        peaks = []
+        for i in range(iterations):
+            user, tenant = prepare()
+            with schema_context(tenant.schema_name):
+                # Trace memory on every tenth call, and leave those calls out
+                # of the timings, since tracing slows them down.
+                traced = i % 10 == 0
+                if traced:
+                    tracemalloc.start()
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    operation(user, tenant)
+                    elapsed = time.perf_counter() - start
+                if traced:
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+                else:
+                    times.append(elapsed * 1000)
+                queries.append(len(context.captured_queries))
+
+        times.sort()
+        return {
+            'calls': iterations,
+            'queries_per_call': statistics.mean(queries),
+            'wall_time_ms': {
+                'mean': statistics.mean(times) if times else None,
+                'p50': self.percentile(times, 50),
+                'p95': self.percentile(times, 95),
+            },
+            'peak_memory_bytes': max(peaks) if peaks else None,
+        }
+
+    def percentile(self, values, percent):
+        """Returns the `percent` percentile of the sorted list `values`."""
+        if not values:
+            return None
+        index = min(len(values) - 1, int(len(values) * percent / 100))
+        return values[index]
@@ -1,7 +1,17 @@
+import random
+from collections import defaultdict
+
 from django.conf import settings
-from django.contrib.auth.models import Permission
-from django.core.management.base import BaseCommand
-from multi_tenant_users.utils import add_user
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from multi_tenant_users.utils import (
+    add_user,
+    bulk_add_users,
+    get_permissions_model,
+)
 from tenant_schemas.utils import schema_context
 
 from example.products.models import Category, Product
@@ -11,9 +21,54 @@ from example.users.models import Tenant, User
 class Command(BaseCommand):
     COMMAND_NAME = 'populate'
 
-    help = 'Populate the database with example data.'
+    help = (
+        'Populate the database with example data, or with a generated load '
+        'fixture if --tenants and --users are given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenants',
+            type=int,
+            help='Number of tenants to generate.',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Number of users to generate.',
+        )
+        parser.add_argument(
+            '--memberships-per-user',
+            type=int,
+            default=1,
+            help='Number of random tenants each generated user belongs to.',
+        )
+        parser.add_argument(
+            '--groups',
+            type=int,
+            default=0,
+            help=(
+                'Number of groups to generate per tenant. Each member of a '
+                'tenant is added to one of them.'
+            ),
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the random choices made while generating.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows to insert per query.',
+        )
 
     def handle(self, *args, **options):
+        if options['tenants'] is not None or options['users'] is not None:
+            return self.generate(**options)
+
         # Create tenants
         public = Tenant.objects.get_or_create(
             name='Public Tenant',
@@ -110,6 +165,13 @@ class Command(BaseCommand):
 
         # Add user permissions and product data
         with schema_context(globochem.schema_name):
+            customers = Group.objects.get_or_create(name='Customers')[0]
+            customers.permissions.add(*Permission.objects.filter(
+                codename__in=['view_category', 'view_product'],
+            ))
+            for user in [bob, david, michael, samir]:
+                user.tenant_permissions.groups.add(customers)
+
             add_category = Permission.objects.get(codename='add_category')
             change_category = Permission.objects.get(codename='change_category')
             delete_category = Permission.objects.get(codename='delete_category')
@@ -169,6 +231,13 @@ class Command(BaseCommand):
             pitpat.categories.add(corporate)
 
         with schema_context(initech.schema_name):
+            customers = Group.objects.get_or_create(name='Customers')[0]
+            customers.permissions.add(*Permission.objects.filter(
+                codename__in=['view_category', 'view_product'],
+            ))
+            for user in [michael, peter, samir]:
+                user.tenant_permissions.groups.add(customers)
+
             add_category = Permission.objects.get(codename='add_category')
             change_category = Permission.objects.get(codename='change_category')
             delete_category = Permission.objects.get(codename='delete_category')
@@ -229,3 +298,134 @@ class Command(BaseCommand):
             price=25,
         )[0]
         premium.categories.add(saas)
+
+    def generate(self, tenants=None, users=None, memberships_per_user=1,
+                 groups=0, seed=0, batch_size=1000, **options):
+        """
+        Generates `tenants` tenants and `users` users who each belong to
+        `memberships_per_user` random tenants, plus `groups` groups per tenant.
+        Generated objects are named after their index, so running the command
+        again with the same arguments and seed creates nothing new.
+        """
+        if not tenants or not users:
+            raise CommandError('--tenants and --users must both be given.')
+        if memberships_per_user > tenants:
+            raise CommandError(
+                '--memberships-per-user must not exceed --tenants.'
+            )
+        rng = random.Random(seed)
+
+        self.stderr.write('Creating %d tenants...' % tenants)
+        tenant_objs = self.generate_tenants(tenants, batch_size)
+
+        self.stderr.write('Creating %d users...' % users)
+        user_ids = self.generate_users(users, batch_size)
+
+        self.stderr.write('Adding users to tenants...')
+        members = defaultdict(list)
+        for user_id in user_ids:
+            for tenant in rng.sample(tenant_objs, memberships_per_user):
+                members[tenant].append(user_id)
+
+        for tenant in tenant_objs:
+            bulk_add_users(members[tenant], tenant, batch_size=batch_size)
+            if groups:
+                with schema_context(tenant.schema_name):
+                    self.generate_groups(
+                        rng,
+                        groups,
+                        members[tenant],
+                        batch_size,
+                    )
+
+    def generate_tenants(self, count, batch_size):
+        """
+        Returns `count` generated tenants, creating any that don't exist yet.
+
+        Instead of letting each tenant create and migrate its own schema on
+        save, the tenants are inserted in bulk, their schemas are created in a
+        single transaction, and all tenant schemas are then migrated at once.
+        """
+        schema_names = ['load%d' % i for i in range(count)]
+        Tenant.objects.bulk_create(
+            [
+                Tenant(
+                    name='Load Tenant %d' % i,
+                    domain_url='%s.local.bitsick.com' % schema_name,
+                    schema_name=schema_name,
+                )
+                for i, schema_name in enumerate(schema_names)
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            for schema_name in schema_names:
+                cursor.execute(
+                    'CREATE SCHEMA IF NOT EXISTS "%s"' % schema_name
+                )
+        call_command('migrate_schemas', tenant=True, interactive=False)
+        return list(
+            Tenant.objects
+            .filter(schema_name__in=schema_names)
+            .order_by('pk')
+        )
+
+    def generate_users(self, count, batch_size):
+        """
+        Returns the IDs of `count` generated users, creating any that don't
+        exist yet. Every generated user's password is "Password!".
+        """
+        # Hashing is deliberately slow, so every user shares one hash.
+        password = make_password('Password!')
+        for start in range(0, count, batch_size):
+            User.objects.bulk_create(
+                [
+                    User(
+                        username='load_user_%d' % i,
+                        email='load_user_%d@example.com' % i,
+                        password=password,
+                    )
+                    for i in range(start, min(start + batch_size, count))
+                ],
+                ignore_conflicts=True,
+            )
+        return list(
+            User.objects
+            .filter(username__startswith='load_user_')
+            .order_by('pk')
+            .values_list('pk', flat=True)[:count]
+        )
+
+    def generate_groups(self, rng, count, user_ids, batch_size):
+        """
+        Creates `count` groups in the current schema, each granted a random
+        selection of permissions, and adds each of the users with IDs
+        `user_ids` to one of them.
+        """
+        permissions = list(Permission.objects.all())
+        group_objs = []
+        for i in range(count):
+            group = Group.objects.get_or_create(name='Load Group %d' % i)[0]
+            group.permissions.set(
+                rng.sample(permissions, rng.randint(0, len(permissions)))
+            )
+            group_objs.append(group)
+
+        PermissionsModel = get_permissions_model()
+        field = PermissionsModel._meta.get_field('groups')
+        through = field.remote_field.through
+        permissions_ids = PermissionsModel.objects.filter(
+            user_id__in=user_ids,
+        ).values_list('pk', flat=True)
+        through.objects.bulk_create(
+            [
+                through(**{
+                    field.m2m_column_name(): permissions_id,
+                    field.m2m_reverse_name(): rng.choice(group_objs).pk,
+                })
+                for permissions_id in permissions_ids.order_by('pk')
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
@@ -21,4 +21,4 @@ class TenantPermissions(TenantPermissionsMixin):
     @is_active.setter
     def is_active(self, value):
         self.user.is_active = value
-        self.user.is_active.save()
+        self.user.save(update_fields=['is_active'])
@@ -1,10 +1,13 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from multi_tenant_users.querysets import PermissionManager
 
 
 class Category(models.Model):
     name = models.CharField(max_length=50)
 
+    objects = PermissionManager()
+
     class Meta:
         verbose_name_plural = _('categories')
 
@@ -21,6 +24,8 @@ class Product(models.Model):
         related_name=_('products'),
     )
 
+    objects = PermissionManager()
+
     def __str__(self):
         return '[{}] {} (${})'.format(
             ', '.join(c.name for c in self.categories.all()),
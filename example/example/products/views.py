@@ -8,7 +8,13 @@ def category_detail(request, pk=None):
     context = {
         'user': request.user,
         'tenant': request.tenant,
-        'category': get_object_or_404(Category, pk=pk),
+        'category': get_object_or_404(
+            Category.objects.visible_to(
+                request.user,
+                'products.view_category',
+            ),
+            pk=pk,
+        ),
     }
     return render(request, 'products/category_detail.html', context)
 
@@ -17,7 +23,10 @@ def category_list(request):
     context = {
         'user': request.user,
         'tenant': request.tenant,
-        'categories': Category.objects.order_by('name'),
+        'categories': Category.objects.visible_to(
+            request.user,
+            'products.view_category',
+        ).order_by('name'),
     }
     return render(request, 'products/category_list.html', context)
 
@@ -26,7 +35,10 @@ def product_detail(request, pk):
     context = {
         'user': request.user,
         'tenant': request.tenant,
-        'product': get_object_or_404(Product, pk=pk),
+        'product': get_object_or_404(
+            Product.objects.visible_to(request.user, 'products.view_product'),
+            pk=pk,
+        ),
     }
     return render(request, 'products/product_detail.html', context)
 
@@ -35,6 +47,9 @@ def product_list(request):
     context = {
         'user': request.user,
         'tenant': request.tenant,
-        'products': Product.objects.order_by('name'),
+        'products': Product.objects.visible_to(
+            request.user,
+            'products.view_product',
+        ).order_by('name'),
     }
     return render(request, 'products/product_list.html', context)
@@ -5,15 +5,15 @@ The `urlpatterns` list routes URLs to views. For more information please see:
 Examples:
 Function views
     1. Add an import:  from my_app import views
-    2. Add a URL to urlpatterns:  url(r'^$', views.home, name='home')
+    2. Add a URL to urlpatterns:  re_path(r'^$', views.home, name='home')
 Class-based views
     1. Add an import:  from other_app.views import Home
-    2. Add a URL to urlpatterns:  url(r'^$', Home.as_view(), name='home')
+    2. Add a URL to urlpatterns:  re_path(r'^$', Home.as_view(), name='home')
 Including another URLconf
-    1. Import the include() function: from django.conf.urls import url, include
-    2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
+    1. Import the include() function: from django.urls import include, re_path
+    2. Add a URL to urlpatterns:  re_path(r'^blog/', include('blog.urls'))
 """
-from django.conf.urls import url
+from django.urls import re_path
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
 
@@ -22,38 +22,36 @@ from . import views
 
 
 urlpatterns = [
-    url(
+    re_path(
         r'^login',
-        auth_views.login,
-        {'template_name': 'login.html'},
+        auth_views.LoginView.as_view(template_name='login.html'),
         name='login',
     ),
-    url(
+    re_path(
         r'^logout',
-        auth_views.logout,
-        {'next_page': '/'},
+        auth_views.LogoutView.as_view(next_page='/'),
         name='logout',
     ),
-    url(r'^admin/', admin.site.urls),
-    url(
+    re_path(r'^admin/', admin.site.urls),
+    re_path(
         r'^categories/(?P<pk>[0-9]+)',
         products_views.category_detail,
         name='category_detail',
     ),
-    url(
+    re_path(
         r'^categories',
         products_views.category_list,
         name='category_list',
     ),
-    url(
+    re_path(
         r'^products/(?P<pk>[0-9]+)',
         products_views.product_detail,
         name='product_detail',
     ),
-    url(
+    re_path(
         r'^products',
         products_views.product_list,
         name='product_list',
     ),
-    url(r'^$', views.index, name='index'),
+    re_path(r'^$', views.index, name='index'),
 ]
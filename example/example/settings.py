@@ -67,6 +67,8 @@ INSTALLED_APPS = (
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
+    'multi_tenant_users',
+
     'example.data',
     'example.permissions',
     'example.products',
@@ -79,6 +81,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'multi_tenant_users.middleware.TenantPermissionsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -174,8 +177,12 @@ STATIC_URL = '/static/'
 # Tenant config
 TENANT_MODEL = 'users.Tenant'
 
+TENANT_LIMIT_SET_CALLS = True
+
 MULTI_TENANT_USERS_PERMISSIONS_MODEL = 'permissions.TenantPermissions'
 
+MULTI_TENANT_USERS_PRELOAD_PATH_PREFIXES = ['/admin/']
+
 
 # This is just to silence warnings. File storage isn't used in this project.
 DEFAULT_FILE_STORAGE = 'tenant_schemas.storage.TenantFileSystemStorage'
@@ -5,15 +5,15 @@ The `urlpatterns` list routes URLs to views. For more information please see:
 Examples:
 Function views
     1. Add an import:  from my_app import views
-    2. Add a URL to urlpatterns:  url(r'^$', views.home, name='home')
+    2. Add a URL to urlpatterns:  re_path(r'^$', views.home, name='home')
 Class-based views
     1. Add an import:  from other_app.views import Home
-    2. Add a URL to urlpatterns:  url(r'^$', Home.as_view(), name='home')
+    2. Add a URL to urlpatterns:  re_path(r'^$', Home.as_view(), name='home')
 Including another URLconf
-    1. Import the include() function: from django.conf.urls import url, include
-    2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
+    1. Import the include() function: from django.urls import include, re_path
+    2. Add a URL to urlpatterns:  re_path(r'^blog/', include('blog.urls'))
 """
-from django.conf.urls import url
+from django.urls import re_path
 from django.contrib import admin
 
 from .products import views as products_views
@@ -21,26 +21,26 @@ from . import views
 
 
 urlpatterns = [
-    url(r'^admin/', admin.site.urls),
-    url(
+    re_path(r'^admin/', admin.site.urls),
+    re_path(
         r'^categories/(?P<pk>[0-9]+)',
         views.tenant_view(products_views.category_detail),
         name='category_detail',
     ),
-    url(
+    re_path(
         r'^categories',
         views.tenant_view(products_views.category_list),
         name='category_list',
     ),
-    url(
+    re_path(
         r'^products/(?P<pk>[0-9]+)',
         views.tenant_view(products_views.product_detail),
         name='product_detail',
     ),
-    url(
+    re_path(
         r'^products',
         views.tenant_view(products_views.product_list),
         name='product_list',
     ),
-    url(r'^$', views.tenant, name='tenant'),
+    re_path(r'^$', views.tenant, name='tenant'),
 ]
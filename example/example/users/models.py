@@ -29,16 +29,8 @@ class User(TenantUser, AbstractUserMixin):
 
     @is_staff.setter
     def is_staff(self, value):
-        try:
-            self.tenant_permissions.is_staff = value
-            self.tenant_permissions.is_staff.save()
-        except self.PermissionsModel.DoesNotExist:
-            if self.id:
-                permissions = self.PermissionsModel(
-                    user_id=self.id,
-                    is_staff=value,
-                )
-                permissions.save()
+        if self.pk is not None:
+            self.update_tenant_permissions(is_staff=value)
 
     def get_short_name(self):
         return self.first_name or self.username
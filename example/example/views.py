@@ -1,15 +1,12 @@
 from django.shortcuts import redirect, render
 from functools import wraps
+from multi_tenant_users.decorators import is_tenant_member
 
 
 def tenant_view(func):
     @wraps(func)
     def inner(request, *args, **kwargs):
-        can_view = (
-            request.user.is_authenticated and
-            request.tenant in request.user.tenants.all()
-        )
-        if can_view:
+        if is_tenant_member(request):
             return func(request, *args, **kwargs)
         else:
             return redirect('http://local.bitsick.com:8000')
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class MultiTenantUsersConfig(AppConfig):
     name = 'multi_tenant_users'
+
+    def ready(self):
+        from . import signals, utils
+        utils.load_permissions_model()
+        signals.connect_receivers()
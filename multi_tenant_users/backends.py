@@ -1,7 +1,40 @@
+from django.conf import settings
 from django.contrib.auth import backends
 from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import router
+from django.utils.crypto import constant_time_compare
 
-from .utils import get_permissions_model
+from .bitmaps import (
+    bitmap_has_module_perms,
+    bitmap_has_perm,
+    decode_permissions,
+    encode_permissions,
+    use_permission_bitmaps,
+)
+from .cache import (
+    PERMISSION_BITMAP_KEY,
+    PERMISSIONS_KEY,
+    get_cached_permissions,
+    get_cached_user,
+    get_permissions_cache,
+    get_permissions_version,
+    get_user_version,
+    set_cached_permissions,
+    set_cached_user,
+)
+from .compat import get_schema_name
+from .effective import (
+    get_effective_permissions_model,
+    has_effective_permission,
+)
+from .instrumentation import instrument, record_cache_access
+from .object_permissions import (
+    get_object_grants,
+    get_object_permissions_model,
+    has_object_permission,
+)
+from .utils import get_group_permissions_query
 
 
 class ModelBackend(backends.ModelBackend):
@@ -11,7 +44,26 @@ class ModelBackend(backends.ModelBackend):
     This class overrides `_get_group_permissions` to find permissions based on
     the user's per-tenant `settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL`
     instance's group memberships instead of the user's direct group
-    memberhsips.
+    memberhsips. A user's direct and group permissions are read together with
+    a single query.
+
+    If `settings.MULTI_TENANT_USERS_PERMISSIONS_CACHE` is set, the permission
+    sets computed by `get_all_permissions` are also stored in that cache and
+    shared across requests. See `multi_tenant_users.cache`.
+
+    If `settings.MULTI_TENANT_USERS_PERMISSION_BITMAPS` is True, permission
+    sets are represented as integer bitmaps, and `has_perm` and
+    `has_module_perms` are answered with bit tests. See
+    `multi_tenant_users.bitmaps`.
+
+    If `settings.MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL` is set,
+    permission sets are read from that table instead, and, unless permission
+    sets are cached or represented as bitmaps, `has_perm` looks up single
+    permissions in it. See `multi_tenant_users.effective`.
+
+    If `settings.MULTI_TENANT_USERS_USER_CACHE` is set, users loaded by
+    `get_user` are stored in that cache, and `get_cached_user` rebuilds them
+    from it. See `multi_tenant_users.middleware.AuthenticationMiddleware`.
     """
     def _get_group_permissions(self, user_obj):
         """
@@ -19,7 +71,290 @@ class ModelBackend(backends.ModelBackend):
         groups they belong to through their
         `settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL` instance.
         """
-        PermissionsModel = get_permissions_model()
-        groups_field = PermissionsModel._meta.get_field('groups')
-        groups_query = 'group__%s' % groups_field.related_query_name()
-        return Permission.objects.filter(**{groups_query: user_obj})
+        return Permission.objects.filter(
+            **{get_group_permissions_query(): user_obj}
+        )
+
+    def get_user(self, user_id):
+        """
+        Returns the user with ID `user_id` from the database, or None, and
+        stores their session auth hash and cached fields in the user cache.
+        """
+        version = get_user_version(user_id)
+        user = super().get_user(user_id)
+        if user is not None and version is not None:
+            set_cached_user(
+                user.pk,
+                version,
+                user.get_session_auth_hash(),
+                {
+                    name: getattr(user, name)
+                    for name in _get_cached_user_fields(type(user))
+                },
+            )
+        return user
+
+    def get_cached_user(self, user_id, session_auth_hash):
+        """
+        Returns the user with ID `user_id` rebuilt from the user cache without
+        querying the database, or None if they aren't cached with the session
+        auth hash `session_auth_hash` or can't authenticate.
+
+        Fields listed in `settings.MULTI_TENANT_USERS_USER_CACHE_FIELDS`, or
+        every field except the password, are cached. Other fields are deferred
+        and loaded from the database when first accessed.
+        """
+        cached = get_cached_user(user_id)
+        hit = cached is not None and constant_time_compare(
+            cached[0],
+            session_auth_hash,
+        )
+        record_cache_access('users', hit)
+        if not hit:
+            return None
+        values = cached[1]
+        UserModel = backends.UserModel
+        field_names = [
+            field.attname
+            for field in UserModel._meta.concrete_fields
+            if field.attname in values
+        ]
+        user = UserModel.from_db(
+            router.db_for_read(UserModel),
+            field_names,
+            [values[name] for name in field_names],
+        )
+        return user if self.user_can_authenticate(user) else None
+
+    def get_user_permissions(self, user_obj, obj=None):
+        with instrument('get_user_permissions'):
+            return super().get_user_permissions(user_obj, obj=obj)
+
+    def get_group_permissions(self, user_obj, obj=None):
+        with instrument('get_group_permissions'):
+            return super().get_group_permissions(user_obj, obj=obj)
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """
+        Returns a set of permission strings the user `user_obj` has in the
+        current tenant, reading it from the shared permissions cache when
+        possible.
+        """
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            if use_permission_bitmaps():
+                user_obj._perm_cache = decode_permissions(
+                    self.get_permission_bitmap(user_obj),
+                )
+            else:
+                user_obj._perm_cache = self._get_cached(
+                    user_obj,
+                    self._get_all_permissions,
+                )
+        return user_obj._perm_cache
+
+    def get_permission_bitmap(self, user_obj):
+        """
+        Returns the bitmap of the permissions the user `user_obj` has in the
+        current tenant, encoding the permission strings already loaded on
+        `user_obj` or else reading it from the shared permissions cache when
+        possible.
+        """
+        if not hasattr(user_obj, '_perm_bitmap'):
+            if not user_obj.is_active or user_obj.is_anonymous:
+                user_obj._perm_bitmap = 0
+            elif hasattr(user_obj, '_perm_cache'):
+                # Filled by preload_tenant_permissions() or from a snapshot.
+                user_obj._perm_bitmap = encode_permissions(
+                    user_obj._perm_cache,
+                )
+            else:
+                user_obj._perm_bitmap = self._get_cached(
+                    user_obj,
+                    lambda user_obj: encode_permissions(
+                        self._get_all_permissions(user_obj)
+                    ),
+                    key=PERMISSION_BITMAP_KEY,
+                )
+        return user_obj._perm_bitmap
+
+    def has_perm(self, user_obj, perm, obj=None):
+        if self._use_effective_permission_lookups(user_obj, obj):
+            return user_obj.is_active and (
+                user_obj.is_superuser
+                or self._has_effective_permission(user_obj, perm)
+            )
+        if obj is not None or not use_permission_bitmaps():
+            return super().has_perm(user_obj, perm, obj=obj)
+        if not user_obj.is_active:
+            return False
+        # The bitmap is built first, since building it may reload the
+        # registry.
+        bitmap = self.get_permission_bitmap(user_obj)
+        return bitmap_has_perm(bitmap, perm)
+
+    def has_module_perms(self, user_obj, app_label):
+        if not use_permission_bitmaps():
+            return super().has_module_perms(user_obj, app_label)
+        if not user_obj.is_active:
+            return False
+        bitmap = self.get_permission_bitmap(user_obj)
+        return bitmap_has_module_perms(bitmap, app_label)
+
+    @instrument('get_all_permissions')
+    def _get_all_permissions(self, user_obj):
+        """
+        Returns a set of permission strings the user `user_obj` has in the
+        current tenant, directly or through their groups.
+
+        Unlike Django's implementation, which queries user and group
+        permissions separately, both are read with a single UNION query that
+        only selects app labels and codenames. Superusers, whose flag is read
+        from the permissions instance itself, get every permission.
+        """
+        fields = ('content_type__app_label', 'codename')
+        EffectivePermission = get_effective_permissions_model()
+        if user_obj.is_superuser:
+            perms = Permission.objects.values_list(*fields)
+        elif EffectivePermission is not None:
+            perms = EffectivePermission.objects.filter(
+                user_id=user_obj.user_id,
+            ).values_list('app_label', 'codename')
+        else:
+            perms = self._get_user_permissions(user_obj).values_list(
+                *fields
+            ).order_by().union(
+                self._get_group_permissions(user_obj).values_list(
+                    *fields
+                ).order_by()
+            )
+        return {'%s.%s' % (ct, name) for ct, name in perms}
+
+    def _use_effective_permission_lookups(self, user_obj, obj):
+        """
+        Returns whether `has_perm` should look up single permissions in the
+        effective permissions table rather than load the user's permission
+        set, which is only done if the set isn't loaded or cached anyway.
+        """
+        return (
+            obj is None
+            and not hasattr(user_obj, '_perm_cache')
+            and get_effective_permissions_model() is not None
+            and not use_permission_bitmaps()
+            and get_permissions_cache() is None
+        )
+
+    def _has_effective_permission(self, user_obj, perm):
+        """
+        Returns whether the user `user_obj` has the permission `perm` according
+        to the effective permissions table, memoizing the answer on
+        `user_obj`.
+        """
+        perms = user_obj.__dict__.setdefault('_effective_perm_cache', {})
+        if perm not in perms:
+            with instrument('has_effective_permission'):
+                perms[perm] = has_effective_permission(user_obj.user_id, perm)
+        return perms[perm]
+
+    def _get_cached(self, user_obj, load, key=PERMISSIONS_KEY):
+        """
+        Returns the permissions of the user `user_obj` from the shared
+        permissions cache, calling `load(user_obj)` and caching the result on a
+        miss. `key` is passed to `get_cached_permissions` and
+        `set_cached_permissions`.
+        """
+        if get_permissions_cache() is None:
+            return load(user_obj)
+
+        schema_name = get_schema_name()
+        version = get_permissions_version(schema_name)
+        permissions = get_cached_permissions(
+            schema_name,
+            user_obj.user_id,
+            version,
+            key=key,
+        )
+        record_cache_access(
+            'permission_bitmaps' if key == PERMISSION_BITMAP_KEY
+            else 'permissions',
+            permissions is not None,
+            schema_name,
+        )
+        if permissions is None:
+            permissions = load(user_obj)
+            set_cached_permissions(
+                schema_name,
+                user_obj.user_id,
+                version,
+                permissions,
+                key=key,
+            )
+        return permissions
+
+
+class ObjectPermissionBackend(backends.BaseBackend):
+    """
+    Answers permission checks on single objects from the grants in
+    `settings.MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL` in the current
+    tenant. See `multi_tenant_users.object_permissions`.
+
+    This backend doesn't authenticate users and doesn't grant model-level
+    permissions, so it's meant to be listed after `ModelBackend` in
+    `settings.AUTHENTICATION_BACKENDS`.
+    """
+    def get_all_permissions(self, user_obj, obj=None):
+        """
+        Returns a set of the permission strings the user `user_obj` has on
+        the object `obj`, directly or through their groups.
+        """
+        if (
+            obj is None
+            or not user_obj.is_active
+            or user_obj.is_anonymous
+            or get_object_permissions_model() is None
+        ):
+            return set()
+        with instrument('get_object_permissions'):
+            grants = get_object_grants(user_obj.user_id, type(obj))
+            perms = grants.filter(object_pk=str(obj.pk)).values_list(
+                'permission__content_type__app_label',
+                'permission__codename',
+            )
+            return {'%s.%s' % (ct, name) for ct, name in perms}
+
+    def has_perm(self, user_obj, perm, obj=None):
+        """
+        Returns whether the user `user_obj` has the permission `perm` on the
+        object `obj`, directly or through their groups, memoizing the answer
+        on `user_obj`.
+        """
+        if (
+            obj is None
+            or not user_obj.is_active
+            or get_object_permissions_model() is None
+        ):
+            return False
+        perms = user_obj.__dict__.setdefault('_object_perm_cache', {})
+        key = (perm, ContentType.objects.get_for_model(obj).pk, str(obj.pk))
+        if key not in perms:
+            with instrument('has_object_permission'):
+                perms[key] = has_object_permission(user_obj.user_id, perm, obj)
+        return perms[key]
+
+
+def _get_cached_user_fields(UserModel):
+    """
+    Returns the attribute names of the fields of `UserModel` that are stored
+    in the user cache.
+    """
+    names = getattr(settings, 'MULTI_TENANT_USERS_USER_CACHE_FIELDS', None)
+    opts = UserModel._meta
+    if names is None:
+        return [
+            field.attname
+            for field in opts.concrete_fields
+            if field.name != 'password'
+        ]
+    fields = {opts.pk} | {opts.get_field(name) for name in names}
+    return [field.attname for field in fields]
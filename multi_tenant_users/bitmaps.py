@@ -0,0 +1,167 @@
+"""Defines a compact, integer bitmap representation of permission sets.
+
+Each permission in a tenant is represented by the bit whose index is the
+permission's primary key, so a user's effective permissions fit in a single
+integer that is cheap to cache and pickle, and checking a permission is a bit
+test. Because primary keys differ between schemas, bitmaps are only
+meaningful together with the `PermissionRegistry` of the schema they were
+built in.
+
+Bitmaps are used by `multi_tenant_users.backends.ModelBackend` when
+`settings.MULTI_TENANT_USERS_PERMISSION_BITMAPS` is True.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+
+from .compat import get_schema_name
+from .instrumentation import instrument
+
+_registries = {}
+
+
+def use_permission_bitmaps():
+    """Returns whether permission bitmaps are enabled."""
+    return getattr(settings, 'MULTI_TENANT_USERS_PERMISSION_BITMAPS', False)
+
+
+class PermissionRegistry(object):
+    """Maps the permissions of one schema to bitmap indexes."""
+    def __init__(self, permissions):
+        """
+        Creates a registry of `permissions`, an iterable of tuples of
+        permission primary key, app label, and codename.
+        """
+        self.indexes = {}
+        self.names = {}
+        self.mask = 0
+        self.module_masks = defaultdict(int)
+        for pk, app_label, codename in permissions:
+            name = '%s.%s' % (app_label, codename)
+            self.indexes[name] = pk
+            self.names[pk] = name
+            self.mask |= 1 << pk
+            self.module_masks[app_label] |= 1 << pk
+
+    @classmethod
+    @instrument('permission_registry')
+    def load(cls):
+        """Creates a registry of the permissions in the current schema."""
+        return cls(
+            Permission.objects
+            .values_list('pk', 'content_type__app_label', 'codename')
+            .order_by()
+        )
+
+    def encode(self, perm_names):
+        """
+        Returns the bitmap of the "app_label.codename" strings `perm_names`.
+        Raises KeyError if any of them isn't registered.
+        """
+        bitmap = 0
+        for name in perm_names:
+            bitmap |= 1 << self.indexes[name]
+        return bitmap
+
+    def decode(self, bitmap):
+        """Returns the set of "app_label.codename" strings in `bitmap`."""
+        return {
+            name
+            for index, name in self.names.items()
+            if bitmap >> index & 1
+        }
+
+    def knows(self, bitmap):
+        """Returns whether every bit set in `bitmap` is registered."""
+        return not bitmap & ~self.mask
+
+    def has_perm(self, bitmap, perm):
+        """Returns whether `bitmap` includes the permission `perm`."""
+        index = self.indexes.get(perm)
+        return index is not None and bool(bitmap >> index & 1)
+
+    def has_module_perms(self, bitmap, app_label):
+        """
+        Returns whether `bitmap` includes any permission in the app
+        `app_label`.
+        """
+        return bool(bitmap & self.module_masks.get(app_label, 0))
+
+
+def get_permission_registry(refresh=False):
+    """
+    Returns the `PermissionRegistry` of the current schema, loading it if it
+    isn't loaded yet or `refresh` is True.
+    """
+    schema_name = get_schema_name()
+    registry = _registries.get(schema_name)
+    if registry is None or refresh:
+        registry = _registries[schema_name] = PermissionRegistry.load()
+    return registry
+
+
+def invalidate_permission_registry(schema_name):
+    """Discards the loaded `PermissionRegistry` of the schema `schema_name`."""
+    _registries.pop(schema_name, None)
+
+
+def encode_permissions(perm_names):
+    """
+    Returns the bitmap of the "app_label.codename" strings `perm_names` in the
+    current schema, reloading the schema's registry once if it doesn't know
+    some of them yet.
+    """
+    try:
+        return get_permission_registry().encode(perm_names)
+    except KeyError:
+        return get_permission_registry(refresh=True).encode(perm_names)
+
+
+def decode_permissions(bitmap):
+    """
+    Returns the set of "app_label.codename" strings in `bitmap` in the current
+    schema, reloading the schema's registry once if it doesn't know some of
+    the bits yet, such as those of a bitmap built by another process.
+    """
+    registry = get_permission_registry()
+    if not registry.knows(bitmap):
+        registry = get_permission_registry(refresh=True)
+    return registry.decode(bitmap)
+
+
+def bitmap_has_perm(bitmap, perm):
+    """
+    Returns whether `bitmap` includes the permission `perm` in the current
+    schema, reloading the schema's registry once if it doesn't know `perm` and
+    some of the bits yet. If it knows every bit, `perm` can't be one of them.
+    """
+    registry = get_permission_registry()
+    if perm not in registry.indexes and not registry.knows(bitmap):
+        registry = get_permission_registry(refresh=True)
+    return registry.has_perm(bitmap, perm)
+
+
+def bitmap_has_module_perms(bitmap, app_label):
+    """
+    Returns whether `bitmap` includes any permission in the app `app_label` in
+    the current schema, reloading the schema's registry once if it doesn't
+    know some of the bits yet.
+    """
+    registry = get_permission_registry()
+    if not registry.knows(bitmap):
+        registry = get_permission_registry(refresh=True)
+    return registry.has_module_perms(bitmap, app_label)
+
+
+def get_permission_pk(perm):
+    """
+    Returns the primary key of the permission `perm`, given as
+    "app_label.codename", in the current schema, or None if there's no such
+    permission, reloading the schema's registry once if it doesn't know `perm`
+    yet.
+    """
+    pk = get_permission_registry().indexes.get(perm)
+    if pk is None:
+        pk = get_permission_registry(refresh=True).indexes.get(perm)
+    return pk
@@ -0,0 +1,314 @@
+"""Defines caches of users' per-tenant permissions and tenant memberships.
+
+Permissions objects memoized on user instances are tracked with an in-process,
+per-schema generation that changes whenever a permissions object in the
+schema is saved or deleted.
+
+Permission sets can also be shared across requests through Django's cache
+framework. The shared cache is disabled unless
+`settings.MULTI_TENANT_USERS_PERMISSIONS_CACHE` names one of the caches in
+`settings.CACHES`. Entries are keyed by schema name and user ID and versioned
+with a per-tenant counter, so any change to a tenant's permission assignments
+invalidates all of that tenant's entries without having to find and delete
+them.
+
+Users' tenant memberships can be cached the same way by setting
+`settings.MULTI_TENANT_USERS_MEMBERSHIP_CACHE`. Each user's sorted tenant IDs
+are stored under a key of their own, versioned with a per-user counter that is
+incremented when the user's memberships change.
+
+Users themselves can be cached by setting
+`settings.MULTI_TENANT_USERS_USER_CACHE`, so that authenticated requests don't
+have to load the user from the database. Each user's field values are stored
+along with their session auth hash under a key of their own, versioned with a
+per-user counter that is incremented whenever the user is saved or deleted.
+
+Versions are always read before the data they guard is loaded from the
+database, so a request that loaded data before a change committed caches it
+under the old version, where it's never read again.
+"""
+import itertools
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+
+PERMISSIONS_KEY = 'multi_tenant_users:permissions:%s:%s'
+PERMISSION_BITMAP_KEY = 'multi_tenant_users:permission_bitmap:%s:%s'
+VERSION_KEY = 'multi_tenant_users:permissions_version:%s'
+MEMBERSHIP_KEY = 'multi_tenant_users:tenant_ids:%s'
+MEMBERSHIP_VERSION_KEY = 'multi_tenant_users:tenant_ids_version:%s'
+USER_KEY = 'multi_tenant_users:user:%s'
+USER_VERSION_KEY = 'multi_tenant_users:user_version:%s'
+
+_generation_counter = itertools.count(1)
+_generations = {}
+
+
+def get_permissions_generation(schema_name):
+    """
+    Returns the current generation of the permissions instances in the schema
+    `schema_name`. The generation changes whenever a permissions instance in
+    that schema is saved or deleted.
+    """
+    return _generations.get(schema_name, 0)
+
+
+def invalidate_tenant_permissions(schema_name):
+    """
+    Invalidates all permissions instances memoized on user instances for the
+    schema `schema_name`.
+    """
+    _generations[schema_name] = next(_generation_counter)
+
+
+def invalidate_permissions(schema_name):
+    """
+    Invalidates both memoized permissions objects and cached permission sets
+    for the schema `schema_name`.
+    """
+    invalidate_tenant_permissions(schema_name)
+    bump_permissions_version(schema_name)
+
+
+def get_permissions_cache():
+    """
+    Returns the cache specified by
+    `settings.MULTI_TENANT_USERS_PERMISSIONS_CACHE`, or None if permissions
+    caching is disabled.
+    """
+    alias = getattr(settings, 'MULTI_TENANT_USERS_PERMISSIONS_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_permissions_timeout():
+    """Returns the number of seconds cached permission sets are kept for."""
+    return getattr(
+        settings,
+        'MULTI_TENANT_USERS_PERMISSIONS_CACHE_TIMEOUT',
+        DEFAULT_TIMEOUT,
+    )
+
+
+def get_permissions_version(schema_name, cache=None):
+    """Returns the current permissions version of the schema `schema_name`."""
+    cache = cache or get_permissions_cache()
+    if cache is None:
+        return None
+    return _get_version(cache, VERSION_KEY % schema_name)
+
+
+def bump_permissions_version(schema_name):
+    """
+    Invalidates every cached permission set in the schema `schema_name` by
+    incrementing the schema's permissions version.
+
+    When called inside a transaction, the version is incremented once the
+    transaction commits so that concurrent requests can't cache permissions
+    read before the commit under the new version.
+    """
+    cache = get_permissions_cache()
+    if cache is not None:
+        keys = [VERSION_KEY % schema_name]
+        transaction.on_commit(lambda: _increment_versions(cache, keys))
+
+
+def _get_version(cache, key):
+    """Returns the counter stored under `key`, initializing it if needed."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _increment_versions(cache, keys):
+    """Increments the counters stored under `keys`."""
+    for key in keys:
+        cache.add(key, 1, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The key was evicted between add() and incr().
+            cache.set(key, 2, None)
+
+
+def get_cached_permissions(schema_name, user_id, version,
+                           key=PERMISSIONS_KEY):
+    """
+    Returns the cached permission set of the user with ID `user_id` in the
+    schema `schema_name` at permissions version `version`, or None if it's not
+    cached. Permission bitmaps are read instead if `key` is
+    `PERMISSION_BITMAP_KEY`.
+    """
+    cache = get_permissions_cache()
+    if cache is None:
+        return None
+    return cache.get(key % (schema_name, user_id), version=version)
+
+
+def set_cached_permissions(schema_name, user_id, version, permissions,
+                           key=PERMISSIONS_KEY):
+    """
+    Caches the permission set `permissions` of the user with ID `user_id` in
+    the schema `schema_name` at permissions version `version`. Permission
+    bitmaps are stored instead if `key` is `PERMISSION_BITMAP_KEY`.
+
+    `version` must be read before `permissions` is loaded from the database so
+    that a concurrent change can't be cached under the new version.
+    """
+    cache = get_permissions_cache()
+    if cache is None:
+        return
+    cache.set(
+        key % (schema_name, user_id),
+        permissions,
+        get_permissions_timeout(),
+        version=version,
+    )
+
+
+def get_membership_cache():
+    """
+    Returns the cache specified by
+    `settings.MULTI_TENANT_USERS_MEMBERSHIP_CACHE`, or None if membership
+    caching is disabled.
+    """
+    alias = getattr(settings, 'MULTI_TENANT_USERS_MEMBERSHIP_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_tenant_ids_version(user_id):
+    """
+    Returns the current membership version of the user with ID `user_id`, or
+    None if membership caching is disabled.
+    """
+    cache = get_membership_cache()
+    if cache is None:
+        return None
+    return _get_version(cache, MEMBERSHIP_VERSION_KEY % user_id)
+
+
+def get_cached_tenant_ids(user_id, version):
+    """
+    Returns the cached, sorted tuple of IDs of the tenants the user with ID
+    `user_id` belongs to at membership version `version`, or None if it's not
+    cached.
+    """
+    cache = get_membership_cache()
+    if cache is None:
+        return None
+    return cache.get(MEMBERSHIP_KEY % user_id, version=version)
+
+
+def set_cached_tenant_ids(user_id, version, tenant_ids):
+    """
+    Caches `tenant_ids` as the IDs of the tenants the user with ID `user_id`
+    belongs to at membership version `version`. The IDs are stored as a sorted
+    tuple, which is compact to store and can be searched with `bisect`.
+
+    `version` must be read before `tenant_ids` is loaded from the database.
+    """
+    cache = get_membership_cache()
+    if cache is None:
+        return
+    cache.set(
+        MEMBERSHIP_KEY % user_id,
+        tuple(sorted(tenant_ids)),
+        getattr(
+            settings,
+            'MULTI_TENANT_USERS_MEMBERSHIP_CACHE_TIMEOUT',
+            DEFAULT_TIMEOUT,
+        ),
+        version=version,
+    )
+
+
+def invalidate_tenant_ids(user_ids):
+    """
+    Invalidates the cached tenant IDs of the users with IDs `user_ids` by
+    incrementing their membership versions once the current transaction, if
+    any, commits.
+    """
+    cache = get_membership_cache()
+    if cache is None:
+        return
+    keys = [MEMBERSHIP_VERSION_KEY % user_id for user_id in user_ids]
+    transaction.on_commit(lambda: _increment_versions(cache, keys))
+
+
+def get_user_cache():
+    """
+    Returns the cache specified by `settings.MULTI_TENANT_USERS_USER_CACHE`,
+    or None if user caching is disabled.
+    """
+    alias = getattr(settings, 'MULTI_TENANT_USERS_USER_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_user_version(user_id):
+    """
+    Returns the current version of the cached user with ID `user_id`, or None
+    if user caching is disabled.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return None
+    return _get_version(cache, USER_VERSION_KEY % user_id)
+
+
+def get_cached_user(user_id):
+    """
+    Returns a tuple of the cached session auth hash and dict of field values,
+    keyed by attribute name, of the user with ID `user_id`, or None if the
+    user isn't cached at their current version.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return None
+    return cache.get(
+        USER_KEY % user_id,
+        version=_get_version(cache, USER_VERSION_KEY % user_id),
+    )
+
+
+def set_cached_user(user_id, version, session_auth_hash, values):
+    """
+    Caches the session auth hash `session_auth_hash` and the dict of field
+    values `values` of the user with ID `user_id` at version `version`.
+
+    `version` must be read with `get_user_version()` before the user is loaded
+    from the database.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return
+    cache.set(
+        USER_KEY % user_id,
+        (session_auth_hash, values),
+        getattr(
+            settings,
+            'MULTI_TENANT_USERS_USER_CACHE_TIMEOUT',
+            DEFAULT_TIMEOUT,
+        ),
+        version=version,
+    )
+
+
+def invalidate_users(user_ids):
+    """
+    Invalidates the cached users with IDs `user_ids` by incrementing their
+    versions once the current transaction, if any, commits.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return
+    keys = [USER_VERSION_KEY % user_id for user_id in user_ids]
+    transaction.on_commit(lambda: _increment_versions(cache, keys))
@@ -1,5 +1,92 @@
 """Provides support for django-tenat-schemas and django-tenants."""
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from . import instrumentation
+from .context import (
+    get_bound_schema_name,
+    restore_unbound_schema,
+    tenant_context,
+)
+
 try:
-    from django_tenants.utils import schema_context  # NOQA: F401
+    from django_tenants.utils import (
+        get_public_schema_name,
+        get_tenant_model,
+        schema_context as _schema_context,
+    )
 except ImportError:
-    from tenant_schemas.utils import schema_context  # NOQA: F401
+    from tenant_schemas.utils import (
+        get_public_schema_name,
+        get_tenant_model,
+        schema_context as _schema_context,
+    )
+
+
+def get_schema_name():
+    """
+    Returns the name of the schema bound to the current context by
+    `schema_context()` or `context.tenant_context()`, or else the name of the
+    schema the default connection is set to.
+    """
+    schema_name = get_bound_schema_name()
+    if schema_name is None:
+        if hasattr(connection, 'tenant'):
+            restore_unbound_schema()
+        schema_name = getattr(connection, 'schema_name', None)
+    return schema_name
+
+
+def get_tenants():
+    """Returns a queryset of all tenants except the public tenant."""
+    return get_tenant_model().objects.exclude(
+        schema_name=get_public_schema_name(),
+    )
+
+
+@contextmanager
+def schema_context(schema_name):
+    """
+    Sets the default connection to the schema `schema_name` within the block
+    and binds the schema to the current context, reporting the switch as a
+    "schema_context" operation.
+    """
+    if get_bound_schema_name() is None and hasattr(connection, 'tenant'):
+        # The connection is restored to this tenant when the block exits.
+        restore_unbound_schema()
+    with tenant_context(schema_name), ExitStack() as stack:
+        # Only the switch is instrumented, since the operations within the
+        # block report their own queries.
+        with instrumentation.instrument('schema_context', schema_name):
+            stack.enter_context(_schema_context(schema_name))
+        yield
+
+
+async def run_in_schema(func, *args, **kwargs):
+    """
+    Calls `func(*args, **kwargs)` in a worker thread in the schema bound to
+    the calling context and returns the result.
+
+    Database connections are thread-local, so the worker thread's connection
+    is switched to the bound schema. The calling thread's connection can't be
+    relied on instead, since an event loop's connection isn't the one the
+    tenant middleware set, so a schema must be bound with
+    `context.tenant_context()` or
+    `middleware.TenantContextMiddleware`.
+    """
+    schema_name = get_bound_schema_name()
+    if schema_name is None:
+        raise ImproperlyConfigured(
+            'No schema is bound to the current context. Install '
+            'multi_tenant_users.middleware.TenantContextMiddleware or use '
+            'multi_tenant_users.context.tenant_context().'
+        )
+
+    def run():
+        with tenant_context(schema_name):
+            return func(*args, **kwargs)
+
+    return await sync_to_async(run)()
@@ -0,0 +1,127 @@
+"""Binds the active tenant schema to the current execution context.
+
+django-tenants and django-tenant-schemas store the active schema on the
+database connection, which is shared by every task running in a thread.
+`tenant_context()` binds a schema to the current context instead, using a
+context variable, so that each asyncio task and each thread has a schema of
+its own. Context variables are carried over into tasks created within the
+block and into `asgiref`'s `sync_to_async()` calls.
+
+The connection isn't switched when the block is entered. Instead, an
+execution wrapper installed on the connection compares the bound schema with
+the connection's just before each query and only switches the connection if
+they differ, so entering a block that no query is made in costs nothing, and
+a tenant that's already active isn't set again. Connections switched this way
+are set back to their previous tenant the next time they're used without a
+bound schema.
+
+The connection backend sets `search_path` lazily when the next cursor is
+created. django-tenants and django-tenant-schemas set it for every cursor
+unless `settings.TENANT_LIMIT_SET_CALLS` is True, which should be set to get
+the full benefit of skipping redundant switches.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.db import connection
+
+SWITCHED_ATTR = '_multi_tenant_users_switched'
+
+_schema_name = contextvars.ContextVar(
+    'multi_tenant_users_schema_name',
+    default=None,
+)
+
+
+def get_bound_schema_name():
+    """
+    Returns the name of the schema bound to the current context, or None if
+    none is.
+    """
+    return _schema_name.get()
+
+
+@contextmanager
+def tenant_context(schema_name):
+    """
+    Binds the schema `schema_name` to the current context within the block.
+
+    Queries made on the default connection within the block, including those
+    made by tasks and `sync_to_async()` calls started within it, run in
+    `schema_name`.
+    """
+    install_schema_wrapper()
+    token = _schema_name.set(schema_name)
+    try:
+        yield
+    finally:
+        _schema_name.reset(token)
+
+
+def install_schema_wrapper(conn=None):
+    """
+    Installs the execution wrapper that applies the bound schema on the
+    connection `conn`, or the default connection, unless it's already
+    installed.
+    """
+    conn = conn or connection
+    if apply_bound_schema not in conn.execute_wrappers:
+        # Inserted first so that Connection.execute_wrapper(), which pops the
+        # last wrapper when its block exits, still removes its own.
+        conn.execute_wrappers.insert(0, apply_bound_schema)
+
+
+def restore_unbound_schema(conn=None):
+    """
+    Sets the connection `conn`, or the default connection, back to the tenant
+    it was set to before it was switched for a bound schema, unless it has
+    been switched again since. Returns whether the connection was switched.
+
+    This is done lazily, whenever the connection is used without a bound
+    schema, because a block may have been entered in another thread than the
+    one whose connection was switched.
+    """
+    conn = conn or connection
+    switched = getattr(conn, SWITCHED_ATTR, None)
+    if switched is None:
+        return False
+    setattr(conn, SWITCHED_ATTR, None)
+    previous_tenant, bound_tenant = switched
+    if conn.tenant is not bound_tenant:
+        return False
+    if previous_tenant is None:
+        conn.set_schema_to_public()
+    else:
+        conn.set_tenant(previous_tenant)
+    return True
+
+
+def apply_bound_schema(execute, sql, params, many, context):
+    """
+    Switches the connection to the schema bound to the current context before
+    executing a query if it's set to another schema, or back to its previous
+    tenant if no schema is bound.
+    """
+    if isinstance(sql, str) and sql.startswith('SET search_path'):
+        # django-tenants sets the search path through the cursor wrapper, for
+        # the schema the connection is already set to.
+        return execute(sql, params, many, context)
+
+    schema_name = _schema_name.get()
+    conn = context['connection']
+    if schema_name is None:
+        switched = restore_unbound_schema(conn)
+    else:
+        switched = conn.schema_name != schema_name
+        if switched:
+            previous_tenant = conn.tenant
+            bound = getattr(conn, SWITCHED_ATTR, None)
+            if bound is not None and bound[1] is previous_tenant:
+                previous_tenant = bound[0]
+            conn.set_schema(schema_name)
+            setattr(conn, SWITCHED_ATTR, (previous_tenant, conn.tenant))
+    if switched:
+        # The backend sets search_path when a cursor is created, and it
+        # applies to the whole session, including the pending query.
+        conn.cursor().close()
+    return execute(sql, params, many, context)
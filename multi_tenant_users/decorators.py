@@ -0,0 +1,45 @@
+"""Defines view decorators for multi-tenant user environments."""
+from functools import wraps
+
+from django.contrib.auth import REDIRECT_FIELD_NAME
+from django.contrib.auth.decorators import user_passes_test
+from django.core.exceptions import PermissionDenied
+
+
+def is_tenant_member(request):
+    """
+    Returns whether the user making `request` is authenticated and belongs to
+    `request.tenant`.
+    """
+    user = request.user
+    return user.is_authenticated and user.is_member_of(request.tenant)
+
+
+def tenant_member_required(function=None,
+                           login_url=None,
+                           redirect_field_name=REDIRECT_FIELD_NAME,
+                           raise_exception=False):
+    """
+    Decorator for views that checks that the user belongs to the current
+    tenant, redirecting to the log-in page if necessary. If `raise_exception`
+    is True, members of other tenants get a 403 response instead.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if is_tenant_member(request):
+                return view_func(request, *args, **kwargs)
+            if raise_exception and request.user.is_authenticated:
+                raise PermissionDenied
+            # Let Django build the log-in redirect.
+            redirect = user_passes_test(
+                lambda user: False,
+                login_url=login_url,
+                redirect_field_name=redirect_field_name,
+            )
+            return redirect(view_func)(request, *args, **kwargs)
+        return _wrapped_view
+
+    if function:
+        return decorator(function)
+    return decorator
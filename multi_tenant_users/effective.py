@@ -0,0 +1,185 @@
+"""Defines a materialized table of users' effective per-tenant permissions.
+
+Resolving a user's permissions joins their permissions instance, groups,
+group permissions, permissions, and content types. A project can instead
+keep every permission each user has in a tenant, directly or through their
+groups, in a table of its own in each tenant schema by creating a model that
+inherits from `AbstractEffectivePermission` in `TENANT_APPS` and naming it in
+`settings.MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL`. For example:
+
+    class EffectivePermission(AbstractEffectivePermission):
+        pass
+
+The table is kept up to date by signal receivers in
+`multi_tenant_users.signals` whenever groups or permissions are assigned,
+unassigned, or deleted, by refreshing the rows of the affected users. Changes
+made without sending Django's signals, such as raw SQL, require running the
+`rebuild_effective_permissions` management command.
+
+Bulk operations that send a signal per row, such as deleting many permissions
+objects, refresh the affected users once, inside `deferred_refresh()`.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from .compat import get_schema_name, schema_context
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    get_group_permissions_query,
+    get_permissions_model,
+)
+
+# Maps schema names to the IDs of the users whose refreshes are deferred.
+_deferred = contextvars.ContextVar('multi_tenant_users_deferred_refreshes')
+
+
+class AbstractEffectivePermission(models.Model):
+    """A permission a user has in a tenant, directly or through a group."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    permission = models.ForeignKey(
+        Permission,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    app_label = models.CharField(_('app label'), max_length=100)
+    codename = models.CharField(_('codename'), max_length=100)
+
+    class Meta:
+        abstract = True
+        # Leads with the columns has_perm() looks up, and implies that each
+        # permission is only stored once per user.
+        unique_together = (('user', 'app_label', 'codename', 'permission'),)
+
+
+def get_effective_permissions_model():
+    """
+    Returns the model specified by
+    `settings.MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL`, or None if
+    effective permissions aren't materialized.
+    """
+    model_name = getattr(
+        settings,
+        'MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL',
+        None,
+    )
+    if model_name is None:
+        return None
+    return _get_model(model_name)
+
+
+@lru_cache(maxsize=None)
+def _get_model(model_name):
+    try:
+        return apps.get_model(model_name, require_ready=False)
+    except LookupError:
+        raise ImproperlyConfigured(
+            _('Failed to import the model specified in '
+              'settings.MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL.')
+        )
+
+
+def refresh_effective_permissions(user_ids=None,
+                                  batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Replaces the effective permissions of the users with IDs `user_ids`, or
+    of every user, in the current schema with the permissions they're
+    assigned directly and through their groups. Returns the number of rows
+    written.
+
+    Inside `deferred_refresh()`, the users are only recorded, and 0 is
+    returned.
+    """
+    EffectivePermission = get_effective_permissions_model()
+    if EffectivePermission is None:
+        return 0
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        deferred = _deferred.get(None)
+        if deferred is not None:
+            deferred.setdefault(get_schema_name(), set()).update(user_ids)
+            return 0
+
+    PermissionsModel = get_permissions_model()
+    queries = (
+        PermissionsModel._meta.get_field('user_permissions')
+        .related_query_name(),
+        get_group_permissions_query(),
+    )
+    rows = set()
+    for query in queries:
+        if user_ids is None:
+            lookup = {'%s__user_id__isnull' % query: False}
+        else:
+            lookup = {'%s__user_id__in' % query: user_ids}
+        rows.update(Permission.objects.filter(**lookup).values_list(
+            '%s__user_id' % query,
+            'pk',
+            'content_type__app_label',
+            'codename',
+        ))
+
+    effective_permissions = EffectivePermission.objects.all()
+    if user_ids is not None:
+        effective_permissions = effective_permissions.filter(
+            user_id__in=user_ids,
+        )
+    effective_permissions.delete()
+    EffectivePermission.objects.bulk_create(
+        [
+            EffectivePermission(
+                user_id=user_id,
+                permission_id=permission_id,
+                app_label=app_label,
+                codename=codename,
+            )
+            for user_id, permission_id, app_label, codename in rows
+        ],
+        batch_size=batch_size,
+    )
+    return len(rows)
+
+
+@contextmanager
+def deferred_refresh():
+    """
+    Defers the refreshes of specific users' effective permissions requested
+    inside the block, such as by signal receivers, and refreshes all of those
+    users at once, per schema, when the block exits without an error.
+    """
+    deferred = {}
+    token = _deferred.set(deferred)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    for schema_name, user_ids in deferred.items():
+        with schema_context(schema_name):
+            refresh_effective_permissions(user_ids)
+
+
+def has_effective_permission(user_id, perm):
+    """
+    Returns whether the user with ID `user_id` has the permission `perm`,
+    given as "app_label.codename", according to the effective permissions of
+    the current schema.
+    """
+    app_label, sep, codename = perm.partition('.')
+    return get_effective_permissions_model().objects.filter(
+        user_id=user_id,
+        app_label=app_label,
+        codename=codename,
+    ).exists()
@@ -0,0 +1,324 @@
+"""Runs maintenance jobs in many tenant schemas in parallel.
+
+`for_each_tenant()` calls a function once in each tenant's schema, spread
+across worker threads or processes that each use a database connection of
+their own, and yields the outcome for each tenant as soon as it's known:
+
+    for result in for_each_tenant(grant_reports, workers=8):
+        if result.error is not None:
+            print(result.tenant.schema_name, result.error)
+
+Each call runs in a transaction of its own, so a failed tenant is rolled back
+without affecting the others. Schemas whose calls succeeded can be recorded in
+a checkpoint file so that an interrupted run can be resumed where it stopped.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from multiprocessing.connection import wait
+
+import django
+from django.apps import apps
+from django.db import connection, connections, transaction
+
+from .compat import get_tenants, schema_context
+
+MODES = ('thread', 'process')
+
+TenantResult = namedtuple('TenantResult', ['tenant', 'result', 'error'])
+
+
+def for_each_tenant(func, tenants=None, workers=1, mode='thread',
+                    timeout=None, checkpoint=None):
+    """
+    Calls `func(tenant)` in the schema of each of `tenants`, or of every
+    tenant except the public one, and returns an iterator that yields a
+    `TenantResult` of each tenant, the value `func` returned, and the
+    exception it raised, if any, in the order the calls finish.
+
+    The calls are made by `workers` threads if `mode` is "thread", or by up to
+    `workers` processes at a time if `mode` is "process", in which case
+    `func`, the tenants, and the results must be picklable. Each call runs in
+    its own transaction.
+
+    If `timeout` is given, a call that's still running after `timeout`
+    seconds yields a `TimeoutError` and the next tenant is started. A process
+    running such a call is terminated. A thread can't be stopped, so the call
+    is left to finish in the background, but it fails with `TimeoutError`
+    when it next queries the database, and on PostgreSQL no single query may
+    run for longer than `timeout` seconds.
+
+    If `checkpoint` is the path of a file, the schema name of each tenant
+    whose call succeeds is appended to it, and tenants already listed in it
+    are skipped.
+    """
+    if mode not in MODES:
+        raise ValueError(
+            'mode must be one of %s, not "%s".' % (', '.join(MODES), mode)
+        )
+    if workers < 1:
+        raise ValueError('workers must be at least 1, not %s.' % workers)
+    return _for_each_tenant(func, tenants, workers, mode, timeout, checkpoint)
+
+
+def _for_each_tenant(func, tenants, workers, mode, timeout, checkpoint):
+    """Yields the results of `for_each_tenant()`."""
+    if tenants is None:
+        tenants = get_tenants()
+    tenants = sorted(tenants, key=lambda tenant: tenant.schema_name)
+    done = _read_checkpoint(checkpoint)
+    tenants = [tenant for tenant in tenants if tenant.schema_name not in done]
+    if not tenants:
+        return
+
+    run = _run_in_processes if mode == 'process' else _run_in_threads
+    call = partial(_call_in_tenant, func, timeout=timeout)
+    with open(checkpoint, 'a') if checkpoint else nullcontext() as f:
+        for result in run(call, tenants, min(workers, len(tenants)), timeout):
+            if f is not None and result.error is None:
+                f.write(result.tenant.schema_name + '\n')
+                f.flush()
+            yield result
+
+
+def _call_in_tenant(func, tenant, timeout=None):
+    """
+    Calls `func(tenant)` in a transaction in the tenant's schema and returns
+    a `TenantResult`.
+    """
+    try:
+        with schema_context(tenant.schema_name), transaction.atomic():
+            if timeout is None:
+                result = func(tenant)
+            else:
+                with _deadline(tenant, timeout):
+                    result = func(tenant)
+    except Exception as e:
+        return TenantResult(tenant, None, e)
+    return TenantResult(tenant, result, None)
+
+
+@contextmanager
+def _deadline(tenant, timeout):
+    """
+    Makes queries on the default connection within the block, and the block
+    itself, fail with `TimeoutError` once `timeout` seconds have passed.
+    """
+    deadline = time.monotonic() + timeout
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                [str(int(timeout * 1000))],
+            )
+
+    def check_deadline(execute, sql, params, many, context):
+        if time.monotonic() > deadline:
+            raise _timeout_error(tenant, timeout)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(check_deadline):
+        yield
+    # A call abandoned after its timeout mustn't commit.
+    if time.monotonic() > deadline:
+        raise _timeout_error(tenant, timeout)
+
+
+def _timeout_error(tenant, timeout):
+    return TimeoutError(
+        'Timed out after %s seconds in schema "%s".'
+        % (timeout, tenant.schema_name)
+    )
+
+
+def _get_deadline(timeout):
+    """Returns the time `timeout` seconds from now, or None if it's None."""
+    if timeout is None:
+        return None
+    return time.monotonic() + timeout
+
+
+def _time_left(deadlines):
+    """
+    Returns the number of seconds until the earliest of `deadlines` that isn't
+    None, or None if there's none.
+    """
+    deadlines = [deadline for deadline in deadlines if deadline is not None]
+    if not deadlines:
+        return None
+    return max(min(deadlines) - time.monotonic(), 0)
+
+
+def _is_expired(deadline):
+    return deadline is not None and deadline <= time.monotonic()
+
+
+def _run_in_threads(call, tenants, workers, timeout):
+    """
+    Yields `call(tenant)` for each of `tenants` from `workers` threads. A
+    thread whose call times out is abandoned and replaced by a new one.
+    """
+    pending = queue.Queue()
+    for task in enumerate(tenants):
+        pending.put(task)
+    # Receives (index, thread, None) when a call starts and
+    # (index, thread, result) when it returns.
+    events = queue.Queue()
+    stopped = threading.Event()
+    lock = threading.Lock()
+    abandoned = set()
+    threads = []
+
+    def work():
+        thread = threading.current_thread()
+        try:
+            while not stopped.is_set():
+                try:
+                    index, tenant = pending.get_nowait()
+                except queue.Empty:
+                    return
+                events.put((index, thread, None))
+                events.put((index, thread, call(tenant)))
+                with lock:
+                    if thread in abandoned:
+                        return
+        finally:
+            connections.close_all()
+
+    def start():
+        # Threads whose calls never return mustn't keep the interpreter
+        # alive.
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    for _ in range(workers):
+        start()
+    running = {}
+    try:
+        for _ in tenants:
+            while True:
+                try:
+                    index, thread, result = events.get(
+                        timeout=_time_left(
+                            deadline for _, deadline in running.values()
+                        ),
+                    )
+                except queue.Empty:
+                    index = next(
+                        (
+                            index for index, (_, deadline) in running.items()
+                            if _is_expired(deadline)
+                        ),
+                        None,
+                    )
+                    if index is None:
+                        continue
+                    thread, _ = running.pop(index)
+                    with lock:
+                        abandoned.add(thread)
+                    start()
+                    yield TenantResult(
+                        tenants[index],
+                        None,
+                        _timeout_error(tenants[index], timeout),
+                    )
+                    break
+                if result is None:
+                    running[index] = (thread, _get_deadline(timeout))
+                elif index in running:
+                    del running[index]
+                    yield result
+                    break
+    finally:
+        stopped.set()
+        for thread in threads:
+            if thread not in abandoned:
+                thread.join(timeout)
+
+
+def _run_in_processes(call, tenants, workers, timeout):
+    """
+    Yields `call(tenant)` for each of `tenants` from up to `workers` processes
+    at a time, each making a single call. A process whose call times out is
+    terminated.
+    """
+    # Forked processes must not share the parent's connections.
+    connections.close_all()
+    pending = list(enumerate(tenants))
+    pending.reverse()
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                index, tenant = pending.pop()
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=_call_in_process,
+                    args=(call, tenant, sender),
+                    daemon=True,
+                )
+                process.start()
+                sender.close()
+                running[receiver] = (index, process, _get_deadline(timeout))
+
+            ready = wait(
+                list(running),
+                _time_left(deadline for _, _, deadline in running.values()),
+            )
+            for receiver in list(running):
+                index, process, deadline = running[receiver]
+                tenant = tenants[index]
+                if receiver in ready:
+                    try:
+                        result = receiver.recv()
+                    except EOFError:
+                        process.join()
+                        result = TenantResult(tenant, None, RuntimeError(
+                            'The worker process exited with code %s.'
+                            % process.exitcode
+                        ))
+                elif _is_expired(deadline):
+                    process.terminate()
+                    result = TenantResult(
+                        tenant,
+                        None,
+                        _timeout_error(tenant, timeout),
+                    )
+                else:
+                    continue
+                del running[receiver]
+                receiver.close()
+                process.join()
+                yield result
+    finally:
+        for receiver, (index, process, deadline) in running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+
+
+def _call_in_process(call, tenant, sender):
+    """Sends `call(tenant)` through the connection `sender`."""
+    if not apps.ready:
+        django.setup()
+    try:
+        sender.send(call(tenant))
+    finally:
+        connections.close_all()
+        sender.close()
+
+
+def _read_checkpoint(checkpoint):
+    """Returns the set of schema names listed in the file `checkpoint`."""
+    if not checkpoint:
+        return set()
+    try:
+        with open(checkpoint) as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
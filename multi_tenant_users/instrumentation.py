@@ -0,0 +1,184 @@
+"""Defines hooks for measuring the database load caused by this package.
+
+Operations that may query the database, such as loading tenant permissions,
+resolving permission sets, adding and removing users, and switching schemas,
+are wrapped in `instrument()`. Each completed operation sends the
+`operation_completed` signal with the keyword arguments `operation`,
+`schema_name`, `queries` (the number of queries made), and `duration` (in
+seconds). Cache lookups send the `cache_accessed` signal with the keyword
+arguments `cache`, `schema_name`, and `hit`.
+
+Measurements can also be gathered without connecting to the signals with
+`collect()`:
+
+    with collect() as collector:
+        ...
+    print(collector.format_summary())
+
+Instrumentation has next to no overhead while neither signal has receivers
+and no collector is active.
+"""
+import contextvars
+import functools
+import inspect
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection
+from django.dispatch import Signal
+
+from . import compat
+
+operation_completed = Signal()
+cache_accessed = Signal()
+
+_collector = contextvars.ContextVar('multi_tenant_users_collector')
+
+
+class Collector(object):
+    """Aggregates the operations and cache accesses recorded by `collect()`."""
+    def __init__(self):
+        self.operations = defaultdict(
+            lambda: {'calls': 0, 'queries': 0, 'duration': 0.0}
+        )
+        self.caches = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record_operation(self, operation, schema_name, queries, duration):
+        stats = self.operations[(operation, schema_name)]
+        stats['calls'] += 1
+        stats['queries'] += queries
+        stats['duration'] += duration
+
+    def record_cache_access(self, cache, schema_name, hit):
+        self.caches[(cache, schema_name)]['hits' if hit else 'misses'] += 1
+
+    def format_summary(self):
+        """
+        Returns a table of the recorded operations, slowest first, followed by
+        a table of the recorded cache accesses.
+        """
+        lines = ['%-32s %-20s %6s %8s %10s' % (
+            'operation', 'schema', 'calls', 'queries', 'time (ms)',
+        )]
+        operations = sorted(
+            self.operations.items(),
+            key=lambda item: item[1]['duration'],
+            reverse=True,
+        )
+        for (operation, schema_name), stats in operations:
+            lines.append('%-32s %-20s %6d %8d %10.2f' % (
+                operation,
+                schema_name,
+                stats['calls'],
+                stats['queries'],
+                stats['duration'] * 1000,
+            ))
+        if self.caches:
+            lines.append('')
+            lines.append('%-32s %-20s %6s %8s' % (
+                'cache', 'schema', 'hits', 'misses',
+            ))
+            for (cache, schema_name), stats in sorted(self.caches.items()):
+                lines.append('%-32s %-20s %6d %8d' % (
+                    cache,
+                    schema_name,
+                    stats['hits'],
+                    stats['misses'],
+                ))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def collect():
+    """
+    Records the operations and cache accesses made in the current thread or
+    task within the block into a new `Collector`, which is returned.
+    """
+    collector = Collector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+@contextmanager
+def instrument(operation, schema_name=None):
+    """
+    Counts and times the queries made within the block and reports them as
+    `operation` in the schema `schema_name`, or in the current schema if
+    `schema_name` is None.
+    """
+    collector = _collector.get(None)
+    if collector is None and not operation_completed.has_listeners():
+        yield
+        return
+
+    if schema_name is None:
+        schema_name = compat.get_schema_name()
+    queries = [0]
+
+    def count_query(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_query):
+            yield
+    finally:
+        duration = time.perf_counter() - start
+        if collector is not None:
+            collector.record_operation(
+                operation,
+                schema_name,
+                queries[0],
+                duration,
+            )
+        operation_completed.send(
+            sender=None,
+            operation=operation,
+            schema_name=schema_name,
+            queries=queries[0],
+            duration=duration,
+        )
+
+
+def instrument_in_tenant(operation):
+    """
+    Returns a decorator that instruments the decorated function as `operation`
+    in the schema of the tenant passed as its `tenant` argument, or in the
+    current schema if that's None.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            tenant = arguments.get('tenant')
+            schema_name = tenant.schema_name if tenant is not None else None
+            with instrument(operation, schema_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache_access(cache, hit, schema_name=None):
+    """
+    Reports a lookup in the cache `cache`, which was a hit if `hit` is True.
+    """
+    collector = _collector.get(None)
+    if collector is None and not cache_accessed.has_listeners():
+        return
+    if schema_name is None:
+        schema_name = compat.get_schema_name()
+    if collector is not None:
+        collector.record_cache_access(cache, schema_name, hit)
+    cache_accessed.send(
+        sender=None,
+        cache=cache,
+        schema_name=schema_name,
+        hit=hit,
+    )
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from multi_tenant_users.compat import get_tenants
+from multi_tenant_users.executor import MODES, for_each_tenant
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = 'for_each_tenant'
+
+    help = (
+        'Call a function with each tenant in the tenant\'s schema, in '
+        'parallel, and print the outcome for each tenant.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'function',
+            help=(
+                'Dotted path of the function to call, such as '
+                'myapp.jobs.grant_reports. It\'s passed the tenant.'
+            ),
+        )
+        parser.add_argument(
+            '--schemas',
+            nargs='+',
+            help='Only run in these schemas. Defaults to every tenant.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker threads or processes.',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=MODES,
+            default='thread',
+            help='Whether workers are threads or processes.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            help='Fail a tenant after this many seconds.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                'Record finished schemas in this file and skip schemas '
+                'already recorded in it.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        try:
+            func = import_string(options['function'])
+        except ImportError as e:
+            raise CommandError(e)
+
+        tenants = None
+        if options['schemas']:
+            tenants = get_tenants().filter(schema_name__in=options['schemas'])
+
+        failed = 0
+        results = for_each_tenant(
+            func,
+            tenants=tenants,
+            workers=options['workers'],
+            mode=options['mode'],
+            timeout=options['timeout'],
+            checkpoint=options['checkpoint'],
+        )
+        for result in results:
+            if result.error is None:
+                self.stdout.write('%s: %r' % (
+                    result.tenant.schema_name,
+                    result.result,
+                ))
+            else:
+                failed += 1
+                self.stderr.write('%s: %s: %s' % (
+                    result.tenant.schema_name,
+                    type(result.error).__name__,
+                    result.error,
+                ))
+
+        if failed:
+            raise CommandError('Failed tenants: %d.' % failed)
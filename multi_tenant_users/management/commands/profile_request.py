@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from multi_tenant_users.instrumentation import collect
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = 'profile_request'
+
+    help = (
+        'Request a path and print a summary of the database queries and cache '
+        'accesses made by multi_tenant_users while handling it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The path to request, such as /.')
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='The host to request, which selects the tenant.',
+        )
+        parser.add_argument(
+            '--username',
+            help='Log in as this user before making the request.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Number of times to make the request.',
+        )
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options['host'])
+        if options['username']:
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.get_by_natural_key(
+                    options['username'],
+                )
+            except UserModel.DoesNotExist:
+                raise CommandError(
+                    'User "%s" does not exist.' % options['username']
+                )
+            client.force_login(user)
+
+        with collect() as collector:
+            for _ in range(options['repeat']):
+                response = client.get(options['path'])
+
+        self.stdout.write('%s %s: %d\n' % (
+            options['host'],
+            options['path'],
+            response.status_code,
+        ))
+        self.stdout.write(collector.format_summary())
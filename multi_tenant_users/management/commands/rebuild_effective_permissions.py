@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from multi_tenant_users.compat import get_tenants
+from multi_tenant_users.effective import (
+    get_effective_permissions_model,
+    refresh_effective_permissions,
+)
+from multi_tenant_users.executor import for_each_tenant
+
+
+def rebuild(tenant):
+    return refresh_effective_permissions()
+
+
+class Command(BaseCommand):
+    COMMAND_NAME = 'rebuild_effective_permissions'
+
+    help = (
+        'Rebuild the effective permissions table of each tenant from the '
+        'permissions assigned to users directly and through groups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schemas',
+            nargs='+',
+            help='Only rebuild these schemas. Defaults to every tenant.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of tenants to rebuild at once.',
+        )
+
+    def handle(self, *args, **options):
+        if get_effective_permissions_model() is None:
+            raise CommandError(
+                'MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL is not set.'
+            )
+
+        tenants = None
+        if options['schemas']:
+            tenants = get_tenants().filter(schema_name__in=options['schemas'])
+
+        failed = 0
+        results = for_each_tenant(
+            rebuild,
+            tenants=tenants,
+            workers=options['workers'],
+        )
+        for result in results:
+            if result.error is None:
+                self.stdout.write('%s: %d permissions' % (
+                    result.tenant.schema_name,
+                    result.result,
+                ))
+            else:
+                failed += 1
+                self.stderr.write('%s: %s: %s' % (
+                    result.tenant.schema_name,
+                    type(result.error).__name__,
+                    result.error,
+                ))
+
+        if failed:
+            raise CommandError('Failed tenants: %d.' % failed)
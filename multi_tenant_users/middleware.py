@@ -0,0 +1,206 @@
+"""Defines middleware for multi-tenant user environments."""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import middleware
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .cache import (
+    get_permissions_cache,
+    get_permissions_generation,
+    get_permissions_version,
+)
+from .compat import get_schema_name
+from .context import tenant_context
+from .instrumentation import collect
+from .permissions import (
+    _get_tenant_permissions_cache,
+    preload_tenant_permissions,
+)
+from .snapshots import restore_snapshot, save_snapshot
+
+logger = logging.getLogger('multi_tenant_users')
+
+
+def get_user(request):
+    """
+    Returns the user associated with the session of `request`, rebuilt from
+    the user cache if the authentication backend supports it and the user is
+    cached with the session's auth hash, or loaded and verified by Django's
+    `get_user` otherwise.
+    """
+    if not hasattr(request, '_cached_user'):
+        user = None
+        session = request.session
+        try:
+            user_id = auth.get_user_model()._meta.pk.to_python(
+                session[auth.SESSION_KEY],
+            )
+            backend_path = session[auth.BACKEND_SESSION_KEY]
+            session_hash = session[auth.HASH_SESSION_KEY]
+        except KeyError:
+            pass
+        else:
+            if backend_path in settings.AUTHENTICATION_BACKENDS:
+                backend = auth.load_backend(backend_path)
+                if hasattr(backend, 'get_cached_user'):
+                    user = backend.get_cached_user(user_id, session_hash)
+        request._cached_user = user or auth.get_user(request)
+    return request._cached_user
+
+
+class AuthenticationMiddleware(middleware.AuthenticationMiddleware):
+    """
+    Replaces `django.contrib.auth.middleware.AuthenticationMiddleware` to
+    serve `request.user` from the user cache of
+    `multi_tenant_users.backends.ModelBackend` when possible.
+
+    With `settings.MULTI_TENANT_USERS_USER_CACHE` set, authenticated requests
+    by cached users don't query the database for the user. The database is
+    only queried if the user isn't cached, if the session's auth hash doesn't
+    match the cached one, such as after a password change, or when a field
+    that isn't cached is accessed.
+    """
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+class TenantPermissionsMiddleware(MiddlewareMixin):
+    """
+    Preloads the current user's permissions in the current tenant.
+
+    The user's permissions instance, groups, and permissions are loaded up
+    front and memoized on `request.user`, so later `has_perm`, `is_staff`, and
+    `groups` lookups during the request are served from memory. This must be
+    installed after the tenant middleware and
+    `django.contrib.auth.middleware.AuthenticationMiddleware`.
+
+    If `settings.MULTI_TENANT_USERS_PRELOAD_PATH_PREFIXES` is set, permissions
+    are only preloaded for requests whose path starts with one of the listed
+    prefixes, such as `['/admin/']`. Permissions already restored by
+    `PermissionSnapshotMiddleware` aren't loaded again.
+    """
+    def process_request(self, request):
+        prefixes = getattr(
+            settings,
+            'MULTI_TENANT_USERS_PRELOAD_PATH_PREFIXES',
+            None,
+        )
+        if prefixes is not None:
+            if not request.path_info.startswith(tuple(prefixes)):
+                return
+        if request.user.is_authenticated:
+            schema_name = get_schema_name()
+            memoized = _get_tenant_permissions_cache(request.user).get(
+                schema_name,
+                (None, None),
+            )
+            if memoized[0] != get_permissions_generation(schema_name):
+                preload_tenant_permissions(request.user)
+
+
+class PermissionSnapshotMiddleware(MiddlewareMixin):
+    """
+    Serves the current user's permissions in the current tenant from a
+    snapshot stored in their session.
+
+    When a request loads the user's permission set, a signed snapshot of their
+    permissions instance and permission set is stored in the session, tagged
+    with the tenant's permissions version. Later requests in the same tenant
+    restore it onto `request.user` until the version changes, so `has_perm`,
+    `is_superuser`, and `is_staff` don't query the database.
+
+    This requires `settings.MULTI_TENANT_USERS_PERMISSIONS_CACHE`, which
+    holds the permissions versions, and must be installed after the tenant
+    middleware, `django.contrib.sessions.middleware.SessionMiddleware`, and
+    `django.contrib.auth.middleware.AuthenticationMiddleware`, and before
+    `TenantPermissionsMiddleware` if both are used.
+    """
+    def __init__(self, get_response):
+        if get_permissions_cache() is None:
+            raise ImproperlyConfigured(
+                'PermissionSnapshotMiddleware requires '
+                'settings.MULTI_TENANT_USERS_PERMISSIONS_CACHE to be set.'
+            )
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        if not request.user.is_authenticated:
+            return
+        schema_name = get_schema_name()
+        version = get_permissions_version(schema_name)
+        if not restore_snapshot(
+            request.session,
+            request.user,
+            schema_name,
+            version,
+        ):
+            request._permission_snapshot_version = (schema_name, version)
+
+    def process_response(self, request, response):
+        snapshot_version = getattr(
+            request,
+            '_permission_snapshot_version',
+            None,
+        )
+        if snapshot_version is not None and request.user.is_authenticated:
+            save_snapshot(request.session, request.user, *snapshot_version)
+        return response
+
+
+class TenantContextMiddleware(object):
+    """
+    Binds the schema of `request.tenant` to the context of each request with
+    `multi_tenant_users.context.tenant_context()`, so that async views and the
+    `ahas_perm()` family of coroutines run in the request's tenant.
+
+    This must be installed after the tenant middleware, and supports both
+    WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with tenant_context(request.tenant.schema_name):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with tenant_context(request.tenant.schema_name):
+            return await self.get_response(request)
+
+
+class InstrumentationMiddleware(object):
+    """
+    Logs a summary of the operations and cache accesses made by this package
+    during each request to the `multi_tenant_users` logger at the DEBUG level.
+
+    This should be installed before any middleware that checks permissions
+    so that their operations are included.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return self.get_response(request)
+        with collect() as collector:
+            response = self.get_response(request)
+        logger.debug(
+            '%s %s\n%s',
+            request.method,
+            request.get_full_path(),
+            collector.format_summary(),
+        )
+        return response
@@ -0,0 +1,12 @@
+"""Defines class-based view mixins for multi-tenant user environments."""
+from django.contrib.auth.mixins import AccessMixin
+
+from .decorators import is_tenant_member
+
+
+class TenantMemberRequiredMixin(AccessMixin):
+    """Verifies that the current user belongs to the current tenant."""
+    def dispatch(self, request, *args, **kwargs):
+        if not is_tenant_member(request):
+            return self.handle_no_permission()
+        return super().dispatch(request, *args, **kwargs)
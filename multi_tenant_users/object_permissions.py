@@ -0,0 +1,163 @@
+"""Defines per-tenant permissions on individual objects.
+
+A project can grant users and groups permissions on single objects, such as
+`products.change_product` on one product, by creating a model that inherits
+from `AbstractObjectPermission` in `TENANT_APPS` and naming it in
+`settings.MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL`. For example:
+
+    class ObjectPermission(AbstractObjectPermission):
+        pass
+
+Adding `multi_tenant_users.backends.ObjectPermissionBackend` to
+`settings.AUTHENTICATION_BACKENDS` then makes `has_perm(perm, obj)` check the
+grants of the user and of their groups in the current tenant with a single
+query. `filter_queryset_by_perm()` filters a queryset down to the objects a
+user has a permission on in the database.
+
+Grants aren't deleted along with the objects they're on.
+"""
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.functions import Cast
+from django.utils.translation import gettext_lazy as _
+
+from .bitmaps import get_permission_pk
+from .utils import get_group_ids
+
+
+class AbstractObjectPermission(models.Model):
+    """
+    A permission a user, or every member of a group, has on a single object in
+    a tenant.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    permission = models.ForeignKey(
+        Permission,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    object_pk = models.CharField(_('object ID'), max_length=255)
+    content_object = GenericForeignKey('content_type', 'object_pk')
+
+    class Meta:
+        abstract = True
+        # Lead with the columns both has_perm() and filter_queryset_by_perm()
+        # look up, end with the object, and imply that each grant is only
+        # stored once.
+        unique_together = (
+            ('user', 'content_type', 'permission', 'object_pk'),
+            ('group', 'content_type', 'permission', 'object_pk'),
+        )
+
+
+def get_object_permissions_model():
+    """
+    Returns the model specified by
+    `settings.MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL`, or None if object
+    permissions aren't enabled.
+    """
+    model_name = getattr(
+        settings,
+        'MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL',
+        None,
+    )
+    if model_name is None:
+        return None
+    return _get_model(model_name)
+
+
+@lru_cache(maxsize=None)
+def _get_model(model_name):
+    try:
+        return apps.get_model(model_name, require_ready=False)
+    except LookupError:
+        raise ImproperlyConfigured(
+            _('Failed to import the model specified in '
+              'settings.MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL.')
+        )
+
+
+def get_object_grants(user_id, model, perm=None):
+    """
+    Returns a queryset of the object permissions that grant the user with ID
+    `user_id` permissions on instances of `model` in the current schema,
+    directly or through their groups, limited to the permission `perm`, given
+    as "app_label.codename", if it's given.
+    """
+    ObjectPermission = get_object_permissions_model()
+    grants = ObjectPermission.objects.filter(
+        models.Q(user_id=user_id)
+        | models.Q(group_id__in=get_group_ids(user_id)),
+        content_type=ContentType.objects.get_for_model(model),
+    )
+    if perm is not None:
+        permission_id = get_permission_pk(perm)
+        if permission_id is None:
+            return grants.none()
+        grants = grants.filter(permission_id=permission_id)
+    return grants
+
+
+def get_granted_object_pks(user_id, model, perm):
+    """
+    Returns a queryset of the primary keys of the instances of `model` the
+    user with ID `user_id` is granted the permission `perm` on in the current
+    schema, for use as a subquery.
+    """
+    return get_object_grants(user_id, model, perm).annotate(
+        object_pk_value=Cast('object_pk', model._meta.pk),
+    ).values('object_pk_value')
+
+
+def has_object_permission(user_id, perm, obj):
+    """
+    Returns whether the user with ID `user_id` has the permission `perm`,
+    given as "app_label.codename", on the object `obj` in the current schema.
+    """
+    return get_object_grants(user_id, type(obj), perm).filter(
+        object_pk=str(obj.pk),
+    ).exists()
+
+
+def filter_queryset_by_perm(user, perm, queryset):
+    """
+    Returns `queryset` filtered down to the objects `user` has the permission
+    `perm`, given as "app_label.codename", on in the current tenant.
+
+    Active superusers have every permission on every object, and inactive and
+    anonymous users have none. Otherwise the user's grants are applied as a
+    subquery, so the objects are filtered, ordered, and paginated by the
+    database.
+    """
+    if user.is_anonymous or not user.is_active:
+        return queryset.none()
+    if user.is_superuser:
+        return queryset
+    return queryset.filter(
+        pk__in=get_granted_object_pks(user.pk, queryset.model, perm),
+    )
@@ -1,13 +1,165 @@
 """Defines per-tenant authorization functionality."""
 from django.conf import settings
 from django.contrib.auth.models import Group, Permission, PermissionsMixin
-from django.core.exceptions import ImproperlyConfigured
-from django.db import models
+from django.db import models, transaction
+from django.db.models.fields.related_descriptors import (
+    ReverseOneToOneDescriptor,
+)
 from django.utils.translation import gettext_lazy as _
 
+from .cache import get_permissions_generation
+from .compat import get_schema_name, run_in_schema
+from .instrumentation import instrument, record_cache_access
 from .utils import get_permissions_model
 
 
+TENANT_PERMISSIONS_CACHE_ATTR = '_tenant_permissions_cache'
+
+
+def _get_tenant_permissions_cache(user):
+    """
+    Returns the dict of permissions instances memoized on `user`, keyed by
+    schema name.
+    """
+    # getattr() and setattr() rather than __dict__ so that lazy objects such
+    # as `request.user` are supported.
+    cache = getattr(user, TENANT_PERMISSIONS_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(user, TENANT_PERMISSIONS_CACHE_ATTR, cache)
+    return cache
+
+
+def get_tenant_permissions(user, PermissionsModel):
+    """
+    Returns the `PermissionsModel` instance for `user` in the current schema.
+
+    The instance is memoized on `user` per schema, so looking up several
+    delegated attributes only queries the database once per tenant. Memoized
+    instances, including missing ones, are discarded when a permissions
+    instance in the same schema is saved or deleted.
+    """
+    if user.pk is None:
+        raise PermissionsModel.DoesNotExist(
+            'Unsaved users have no tenant permissions.'
+        )
+
+    schema_name = get_schema_name()
+    generation = get_permissions_generation(schema_name)
+    cache = _get_tenant_permissions_cache(user)
+    cached_generation, permissions = cache.get(schema_name, (None, None))
+
+    hit = cached_generation == generation
+    record_cache_access('tenant_permissions', hit, schema_name)
+    if not hit:
+        try:
+            with instrument('tenant_permissions', schema_name):
+                permissions = PermissionsModel._base_manager.get(
+                    user_id=user.pk,
+                )
+            permissions.user = user
+        except PermissionsModel.DoesNotExist:
+            permissions = None
+        cache[schema_name] = (generation, permissions)
+
+    if permissions is None:
+        raise PermissionsModel.DoesNotExist(
+            'The user has no permissions in the current tenant.'
+        )
+    return permissions
+
+
+def set_tenant_permissions(user, permissions):
+    """
+    Memoizes `permissions` as the permissions instance of `user` in the current
+    schema.
+    """
+    schema_name = get_schema_name()
+    generation = get_permissions_generation(schema_name)
+    cache = _get_tenant_permissions_cache(user)
+    cache[schema_name] = (generation, permissions)
+
+
+@instrument('preload_tenant_permissions')
+def preload_tenant_permissions(user):
+    """
+    Loads the permissions instance of `user` in the current schema along with
+    its groups and permissions, and memoizes it on `user`.
+
+    Django's `ModelBackend` caches permission strings on the permissions
+    instance in `_user_perm_cache`, `_group_perm_cache`, and `_perm_cache`.
+    Those caches are filled from the prefetched objects so that later
+    permission checks don't query the database.
+    """
+    PermissionsModel = get_permissions_model()
+    permission_queryset = Permission.objects.select_related('content_type')
+    try:
+        permissions = PermissionsModel._base_manager.prefetch_related(
+            'groups',
+            models.Prefetch('groups__permissions', permission_queryset),
+            models.Prefetch('user_permissions', permission_queryset),
+        ).get(user_id=user.pk)
+    except PermissionsModel.DoesNotExist:
+        permissions = None
+    else:
+        permissions.user = user
+        if not permissions.is_superuser:
+            user_perms = _get_permission_names(permissions.user_permissions)
+            group_perms = set()
+            for group in permissions.groups.all():
+                group_perms.update(_get_permission_names(group.permissions))
+            permissions._user_perm_cache = user_perms
+            permissions._group_perm_cache = group_perms
+            permissions._perm_cache = user_perms | group_perms
+    set_tenant_permissions(user, permissions)
+    return permissions
+
+
+def _get_permission_names(manager):
+    """
+    Returns the set of "app_label.codename" strings of the permissions in the
+    prefetched related manager `manager`.
+    """
+    return {
+        '%s.%s' % (permission.content_type.app_label, permission.codename)
+        for permission in manager.all()
+    }
+
+
+class TenantPermissionsDescriptor(ReverseOneToOneDescriptor):
+    """
+    Provides `user.tenant_permissions`, the reverse side of
+    `TenantPermissionsMixin.user`.
+
+    Django's `ReverseOneToOneDescriptor` caches the related instance once per
+    user instance regardless of the active schema, which would leak one
+    tenant's permissions into another. This descriptor memoizes the related
+    instance per schema instead.
+    """
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        try:
+            return get_tenant_permissions(instance, self.related.related_model)
+        except self.related.related_model.DoesNotExist as e:
+            raise self.RelatedObjectDoesNotExist(*e.args)
+
+    def __set__(self, instance, value):
+        super().__set__(instance, value)
+        set_tenant_permissions(instance, value)
+
+
+class TenantPermissionsOneToOneField(models.OneToOneField):
+    """A one-to-one field that uses `TenantPermissionsDescriptor`."""
+    related_accessor_class = TenantPermissionsDescriptor
+
+    def deconstruct(self):
+        # The field is interchangeable with a plain OneToOneField in the
+        # database, so migrations don't need to know about it.
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.OneToOneField', args, kwargs
+
+
 class TenantPermissionsMixin(PermissionsMixin):
     """Maps a user instance to per-tenant permissions.
 
@@ -16,7 +168,7 @@ class TenantPermissionsMixin(PermissionsMixin):
     name values. This also avoids a conflict with
     `django.contrib.auth.models.User`'s reverse accessors.
     """
-    user = models.OneToOneField(
+    user = TenantPermissionsOneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='tenant_permissions',
@@ -55,18 +207,54 @@ class TenantPermissionsDelegator(object):
     all implementations delegate functionality to the related permissions
     instance's user instance.
     """
-    _PermissionsModel = None
-
     @property
     def PermissionsModel(self):
-        if not self._PermissionsModel:
-            self._PermissionsModel = get_permissions_model()
-        return self._PermissionsModel
+        return get_permissions_model()
 
     @property
     def tenant_permissions(self):
         """The tenant-specific permissions object for this user."""
-        return self.PermissionsModel.objects.get(user_id=self.id)
+        return get_tenant_permissions(self, self.PermissionsModel)
+
+    def clear_tenant_permissions_cache(self):
+        """Discards the permissions objects memoized on this user instance."""
+        self.__dict__.pop(TENANT_PERMISSIONS_CACHE_ATTR, None)
+
+    @transaction.atomic
+    def update_tenant_permissions(self, groups=None, user_permissions=None,
+                                  **fields):
+        """
+        Creates or updates this user's permissions instance in the current
+        tenant and returns it.
+
+        `fields` are saved on the instance with a single `update_or_create`,
+        and `groups` and `user_permissions`, if given, replace the instance's
+        groups and permissions by adding and removing only the difference.
+        All changes are made in one transaction, and the signals they send
+        invalidate cached permissions.
+        """
+        if self.pk is None:
+            raise ValueError('Unsaved users have no tenant permissions.')
+        manager = self.PermissionsModel._base_manager
+        permissions, created = manager.update_or_create(
+            user_id=self.pk,
+            defaults=fields,
+        )
+        permissions.user = self
+        for name, value in (
+            ('groups', groups),
+            ('user_permissions', user_permissions),
+        ):
+            if value is None:
+                continue
+            related_manager = getattr(permissions, name)
+            if created:
+                # There's nothing to diff against yet.
+                related_manager.add(*value)
+            else:
+                related_manager.set(value)
+        set_tenant_permissions(self, permissions)
+        return permissions
 
     @property
     def is_superuser(self):
@@ -81,16 +269,8 @@ class TenantPermissionsDelegator(object):
 
     @is_superuser.setter
     def is_superuser(self, value):
-        try:
-            self.tenant_permissions.is_superuser = value
-            self.tenant_permissions.is_superuser.save()
-        except self.PermissionsModel.DoesNotExist:
-            if self.id:
-                permissions = self.PermissionsModel(
-                    user_id=self.id,
-                    is_superuser=value,
-                )
-                permissions.save()
+        if self.pk is not None:
+            self.update_tenant_permissions(is_superuser=value)
 
     @property
     def groups(self):
@@ -105,16 +285,8 @@ class TenantPermissionsDelegator(object):
 
     @groups.setter
     def groups(self, value):
-        try:
-            self.tenant_permissions.groups = value
-            self.tenant_permissions.save()
-        except self.PermissionsModel.DoesNotExist:
-            if self.id:
-                permissions = self.PermissionsModel(
-                    user_id=self.id,
-                    groups=value,
-                )
-                permissions.save()
+        if self.pk is not None:
+            self.update_tenant_permissions(groups=value)
 
     @property
     def user_permissions(self):
@@ -126,16 +298,8 @@ class TenantPermissionsDelegator(object):
 
     @user_permissions.setter
     def user_permissions(self, value):
-        try:
-            self.tenant_permissions.user_permissions = value
-            self.tenant_permissions.save()
-        except self.PermissionsModel.DoesNotExist:
-            if self.id:
-                permissions = self.PermissionsModel(
-                    user_id=self.id,
-                    user_permissions=value,
-                )
-                permissions.save()
+        if self.pk is not None:
+            self.update_tenant_permissions(user_permissions=value)
 
     def get_group_permissions(self, obj=None):
         """
@@ -154,6 +318,10 @@ class TenantPermissionsDelegator(object):
         except self.PermissionsModel.DoesNotExist:
             return set()
 
+    async def aget_all_permissions(self, obj=None):
+        """See `get_all_permissions()` and `ahas_perm()`."""
+        return await run_in_schema(self.get_all_permissions, obj=obj)
+
     def has_perm(self, perm, obj=None):
         """
         Return True if the user has the specified permission. Query all
@@ -167,6 +335,13 @@ class TenantPermissionsDelegator(object):
         except self.PermissionsModel.DoesNotExist:
             return False
 
+    async def ahas_perm(self, perm, obj=None):
+        """
+        See `has_perm()`. The check is made in a worker thread in the schema
+        bound to the current context. See `compat.run_in_schema()`.
+        """
+        return await run_in_schema(self.has_perm, perm, obj=obj)
+
     def has_perms(self, perm_list, obj=None):
         """
         Return True if the user has each of the specified permissions. If
@@ -177,6 +352,10 @@ class TenantPermissionsDelegator(object):
         except self.PermissionsModel.DoesNotExist:
             return False
 
+    async def ahas_perms(self, perm_list, obj=None):
+        """See `has_perms()` and `ahas_perm()`."""
+        return await run_in_schema(self.has_perms, perm_list, obj=obj)
+
     def has_module_perms(self, app_label):
         """
         Return True if the user has any permissions in the given app label.
@@ -0,0 +1,79 @@
+"""Defines querysets that filter objects by users' per-tenant permissions.
+
+Models whose managers are built from `PermissionQuerySet`, or from a queryset
+class that includes `PermissionQuerySetMixin`, can be filtered down to the
+objects a user has a permission on in the current tenant:
+
+    class Product(models.Model):
+        objects = PermissionManager()
+
+    products = Product.objects.visible_to(user, 'products.view_product')
+
+The user's permissions are applied as subqueries, so filtering, ordering, and
+pagination all happen in the database.
+"""
+from django.contrib.auth.models import Group
+from django.db import models
+
+from .bitmaps import get_permission_pk
+from .object_permissions import (
+    get_granted_object_pks,
+    get_object_permissions_model,
+)
+from .utils import get_group_ids, get_permissions_model
+
+
+class PermissionQuerySetMixin(object):
+    """Adds `visible_to` to a queryset class."""
+    def visible_to(self, user, perm):
+        """
+        Returns the objects `user` has the permission `perm`, given as
+        "app_label.codename", on in the current tenant.
+
+        Active superusers and users with `perm`, directly or through their
+        groups, see every object. If object permissions are enabled, other
+        users see the objects they or their groups are granted `perm` on.
+        Inactive and anonymous users see none.
+        """
+        if user.is_anonymous or not user.is_active:
+            return self.none()
+        PermissionsModel = get_permissions_model()
+        condition = models.Q(models.Exists(
+            PermissionsModel._base_manager.filter(
+                user_id=user.pk,
+                is_superuser=True,
+            )
+        ))
+
+        permission_id = get_permission_pk(perm)
+        if permission_id is not None:
+            user_permissions = PermissionsModel._meta.get_field(
+                'user_permissions'
+            )
+            condition |= models.Q(models.Exists(
+                user_permissions.remote_field.through.objects.filter(**{
+                    '%s__user_id' % user_permissions.m2m_field_name():
+                        user.pk,
+                    user_permissions.m2m_reverse_field_name():
+                        permission_id,
+                })
+            ))
+            condition |= models.Q(models.Exists(
+                Group.permissions.through.objects.filter(
+                    group_id__in=get_group_ids(user.pk),
+                    permission_id=permission_id,
+                )
+            ))
+
+        if get_object_permissions_model() is not None:
+            condition |= models.Q(
+                pk__in=get_granted_object_pks(user.pk, self.model, perm),
+            )
+        return self.filter(condition)
+
+
+class PermissionQuerySet(PermissionQuerySetMixin, models.QuerySet):
+    pass
+
+
+PermissionManager = models.Manager.from_queryset(PermissionQuerySet)
@@ -0,0 +1,254 @@
+"""Defines signal receivers that keep per-tenant caches consistent."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.signals import setting_changed
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+
+from .bitmaps import invalidate_permission_registry
+from .cache import (
+    bump_permissions_version,
+    invalidate_permissions,
+    invalidate_tenant_ids,
+    invalidate_users,
+)
+from .compat import get_schema_name
+from .effective import (
+    get_effective_permissions_model,
+    refresh_effective_permissions,
+)
+from .utils import get_permissions_model, reset_permissions_model
+
+M2M_CHANGE_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+AFFECTED_USER_IDS_ATTR = '_multi_tenant_users_affected_user_ids'
+
+
+def permissions_changed(sender, **kwargs):
+    """
+    Invalidates memoized permissions objects and cached permission sets for
+    the current schema.
+    """
+    invalidate_permissions(get_schema_name())
+
+
+def permission_assignments_changed(sender, action, **kwargs):
+    """
+    Invalidates cached permission sets for the current schema when groups or
+    permissions are assigned or unassigned.
+    """
+    if action in M2M_CHANGE_ACTIONS:
+        bump_permissions_version(get_schema_name())
+
+
+def permission_objects_deleted(sender, **kwargs):
+    """
+    Invalidates cached permission sets for the current schema when a group or
+    permission is deleted, since cascading deletes of many-to-many rows don't
+    send `m2m_changed`.
+    """
+    bump_permissions_version(get_schema_name())
+
+
+def permission_registry_changed(sender, **kwargs):
+    """
+    Discards the permission bitmap registry of the current schema when a
+    permission is created, changed, or deleted.
+    """
+    invalidate_permission_registry(get_schema_name())
+
+
+def memberships_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidates cached tenant memberships of the affected users."""
+    if not reverse:
+        if action in M2M_CHANGE_ACTIONS:
+            instance.clear_tenant_membership_cache()
+            invalidate_tenant_ids([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_tenant_ids(pk_set)
+    elif action == 'pre_clear':
+        field = get_user_model()._meta.get_field('tenants')
+        invalidate_tenant_ids(
+            sender.objects
+            .filter(**{field.m2m_reverse_field_name(): instance.pk})
+            .values_list(field.m2m_column_name(), flat=True)
+        )
+
+
+def user_changed(sender, instance, **kwargs):
+    """Invalidates the cached user when a user is saved or deleted."""
+    invalidate_users([instance.pk])
+
+
+def effective_permissions_changed(sender, instance, action, reverse, pk_set,
+                                  **kwargs):
+    """
+    Refreshes the effective permissions of the users affected when groups or
+    permissions are assigned or unassigned.
+    """
+    if get_effective_permissions_model() is None:
+        return
+    if action == 'pre_clear':
+        # The affected users can't be found once the rows are gone.
+        setattr(instance, AFFECTED_USER_IDS_ATTR, _get_affected_user_ids(
+            sender,
+            instance,
+            reverse,
+            None,
+        ))
+    elif action == 'post_clear':
+        refresh_effective_permissions(
+            instance.__dict__.pop(AFFECTED_USER_IDS_ATTR, []),
+        )
+    elif action in ('post_add', 'post_remove'):
+        refresh_effective_permissions(
+            _get_affected_user_ids(sender, instance, reverse, pk_set),
+        )
+
+
+def effective_permissions_group_deleting(sender, instance, **kwargs):
+    """Records the members of a group that is about to be deleted."""
+    if get_effective_permissions_model() is None:
+        return
+    setattr(instance, AFFECTED_USER_IDS_ATTR, list(
+        get_permissions_model().objects
+        .filter(groups=instance)
+        .values_list('user_id', flat=True)
+    ))
+
+
+def effective_permissions_deleted(sender, instance, **kwargs):
+    """
+    Refreshes the effective permissions of the members of a deleted group or
+    of the user of a deleted permissions instance.
+    """
+    if get_effective_permissions_model() is None:
+        return
+    if isinstance(instance, Group):
+        user_ids = instance.__dict__.pop(AFFECTED_USER_IDS_ATTR, [])
+    else:
+        user_ids = [instance.user_id]
+    refresh_effective_permissions(user_ids)
+
+
+def _get_affected_user_ids(sender, instance, reverse, pk_set):
+    """
+    Returns the IDs of the users whose permissions are changed by an
+    `m2m_changed` signal, or, if `pk_set` is None, by clearing the relation.
+    """
+    PermissionsModel = get_permissions_model()
+    if sender is Group.permissions.through:
+        if not reverse:
+            lookup = {'groups': instance}
+        elif pk_set is None:
+            lookup = {'groups__permissions': instance}
+        else:
+            lookup = {'groups__in': pk_set}
+    elif not reverse:
+        return [instance.user_id]
+    elif pk_set is None:
+        if sender is PermissionsModel.groups.through:
+            lookup = {'groups': instance}
+        else:
+            lookup = {'user_permissions': instance}
+    else:
+        lookup = {'pk__in': pk_set}
+    return list(
+        PermissionsModel.objects
+        .filter(**lookup)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+
+
+def permissions_model_setting_changed(setting, **kwargs):
+    """
+    Discards the resolved permissions model when
+    `settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL` is overridden.
+    """
+    if setting == 'MULTI_TENANT_USERS_PERMISSIONS_MODEL':
+        reset_permissions_model()
+
+
+def connect_receivers():
+    """
+    Connects the receivers in this module to the permissions and user models.
+    """
+    PermissionsModel = get_permissions_model()
+    post_save.connect(
+        permissions_changed,
+        sender=PermissionsModel,
+        dispatch_uid='multi_tenant_users.permissions_saved',
+    )
+    post_delete.connect(
+        permissions_changed,
+        sender=PermissionsModel,
+        dispatch_uid='multi_tenant_users.permissions_deleted',
+    )
+
+    m2m_senders = (
+        ('groups', PermissionsModel.groups.through),
+        ('user_permissions', PermissionsModel.user_permissions.through),
+        ('group_permissions', Group.permissions.through),
+    )
+    for name, through in m2m_senders:
+        m2m_changed.connect(
+            permission_assignments_changed,
+            sender=through,
+            dispatch_uid='multi_tenant_users.%s_changed' % name,
+        )
+        m2m_changed.connect(
+            effective_permissions_changed,
+            sender=through,
+            dispatch_uid='multi_tenant_users.%s_effective_permissions' % name,
+        )
+    pre_delete.connect(
+        effective_permissions_group_deleting,
+        sender=Group,
+        dispatch_uid='multi_tenant_users.group_deleting_effective_permissions',
+    )
+    for model in (Group, PermissionsModel):
+        post_delete.connect(
+            effective_permissions_deleted,
+            sender=model,
+            dispatch_uid='multi_tenant_users.%s_effective_permissions' % (
+                model._meta.model_name,
+            ),
+        )
+
+    for model in (Group, Permission):
+        post_delete.connect(
+            permission_objects_deleted,
+            sender=model,
+            dispatch_uid='multi_tenant_users.%s_deleted' % (
+                model._meta.model_name,
+            ),
+        )
+
+    for signal in (post_save, post_delete):
+        signal.connect(
+            permission_registry_changed,
+            sender=Permission,
+            dispatch_uid='multi_tenant_users.permission_registry_changed',
+        )
+
+    m2m_changed.connect(
+        memberships_changed,
+        sender=get_user_model().tenants.through,
+        dispatch_uid='multi_tenant_users.memberships_changed',
+    )
+    for signal in (post_save, post_delete):
+        signal.connect(
+            user_changed,
+            sender=get_user_model(),
+            dispatch_uid='multi_tenant_users.user_changed',
+        )
+
+    setting_changed.connect(
+        permissions_model_setting_changed,
+        dispatch_uid='multi_tenant_users.permissions_model_setting_changed',
+    )
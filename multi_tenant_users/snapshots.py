@@ -0,0 +1,108 @@
+"""Stores snapshots of users' tenant permissions in their sessions.
+
+A snapshot holds the field values of a user's permissions instance in a
+tenant, such as `is_superuser` and `is_staff`, and the user's permission set,
+as a bitmap if permission bitmaps are enabled. Snapshots are signed and
+stored in the session per schema along with the tenant's permissions version
+from `multi_tenant_users.cache`, so any change to the tenant's permissions
+invalidates them. Restoring a snapshot memoizes an equivalent permissions
+instance on the user, so permission checks don't query the database.
+
+See `multi_tenant_users.middleware.PermissionSnapshotMiddleware`.
+"""
+from django.core import signing
+
+from .bitmaps import encode_permissions, use_permission_bitmaps
+from .permissions import _get_tenant_permissions_cache, set_tenant_permissions
+from .utils import get_permissions_model
+
+SESSION_KEY = '_multi_tenant_users_permissions'
+SALT = 'multi_tenant_users.snapshots'
+
+
+def restore_snapshot(session, user, schema_name, version):
+    """
+    Memoizes the permissions instance of `user` in the schema `schema_name`
+    from the snapshot in `session`, if there's a valid one for permissions
+    version `version`. Returns whether a snapshot was restored.
+    """
+    signed = session.get(SESSION_KEY, {}).get(schema_name)
+    if signed is None:
+        return False
+    try:
+        snapshot = signing.loads(signed, salt=SALT)
+    except signing.BadSignature:
+        return False
+    if (
+        snapshot['version'] != version
+        or snapshot['user'] != user.pk
+        or snapshot['bitmap'] != use_permission_bitmaps()
+    ):
+        return False
+
+    if snapshot['fields'] is None:
+        permissions = None
+    else:
+        PermissionsModel = get_permissions_model()
+        permissions = PermissionsModel.from_db(
+            None,
+            list(snapshot['fields']),
+            list(snapshot['fields'].values()),
+        )
+        permissions.user = user
+        if snapshot['bitmap']:
+            permissions._perm_bitmap = snapshot['permissions']
+        else:
+            permissions._perm_cache = set(snapshot['permissions'])
+    set_tenant_permissions(user, permissions)
+    return True
+
+
+def save_snapshot(session, user, schema_name, version):
+    """
+    Stores a snapshot of the permissions instance memoized on `user` for the
+    schema `schema_name` in `session`, tagged with permissions version
+    `version`, if the user's permission set was loaded. Returns whether a
+    snapshot was stored.
+    """
+    memoized = _get_tenant_permissions_cache(user).get(schema_name)
+    if memoized is None:
+        return False
+    permissions = memoized[1]
+    bitmap = use_permission_bitmaps()
+    if permissions is None:
+        fields = None
+        perms = None
+    else:
+        perms = getattr(permissions, '_perm_bitmap', None)
+        if perms is None or not bitmap:
+            perms = getattr(permissions, '_perm_cache', None)
+            if perms is None:
+                return False
+            perms = encode_permissions(perms) if bitmap else sorted(perms)
+        fields = {
+            field.attname: getattr(permissions, field.attname)
+            for field in permissions._meta.concrete_fields
+        }
+
+    try:
+        signed = signing.dumps(
+            {
+                'version': version,
+                'user': user.pk,
+                'bitmap': bitmap,
+                'fields': fields,
+                'permissions': perms,
+            },
+            salt=SALT,
+            compress=True,
+        )
+    except TypeError:
+        # A field value isn't JSON serializable.
+        return False
+    snapshots = session.get(SESSION_KEY, {})
+    if snapshots.get(schema_name) == signed:
+        return False
+    snapshots[schema_name] = signed
+    session[SESSION_KEY] = snapshots
+    return True
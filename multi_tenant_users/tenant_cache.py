@@ -0,0 +1,167 @@
+"""Namespaces cache keys by tenant.
+
+Keys of caches shared by every tenant must include the tenant's schema name,
+or one tenant's data can be served to another. Two ways of doing that are
+provided.
+
+`TenantCache` wraps one of the caches in `settings.CACHES` and prefixes every
+key with the current schema name and the schema's generation, a counter stored
+in the wrapped cache:
+
+    cache = get_tenant_cache('default')
+    cache.set('report', report)
+
+Incrementing the generation with `invalidate()` makes all of a tenant's
+entries unreachable at once, without finding and deleting them, and they
+expire on their own. This costs one extra cache read per operation.
+
+`make_key()` can be set as the `KEY_FUNCTION` of a cache in `settings.CACHES`
+to prefix every key of that cache, including those of Django's own cache
+middleware and `cache_page()`, with the current schema name. It doesn't
+support generations, since key functions have no access to a cache to read
+them from. It shouldn't be set on the caches named by
+`settings.MULTI_TENANT_USERS_MEMBERSHIP_CACHE` or
+`settings.MULTI_TENANT_USERS_USER_CACHE`, whose entries are shared by every
+tenant.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from .cache import _get_version, _increment_versions
+from .compat import get_schema_name
+
+GENERATION_KEY = 'multi_tenant_users:cache_generation:%s'
+
+
+def make_key(key, key_prefix, version):
+    """
+    Returns the cache key of `key` in the current schema. This can be used as
+    the `KEY_FUNCTION` of a cache.
+    """
+    return '%s:%s:%s:%s' % (key_prefix, version, get_schema_name(), key)
+
+
+class TenantCache(object):
+    """
+    Wraps the cache `cache`, namespacing its keys by schema and schema
+    generation.
+
+    Methods take the same arguments as those of Django's cache backends, plus
+    an optional `schema_name`, which defaults to the current schema.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get_generation(self, schema_name=None):
+        """Returns the current generation of the schema `schema_name`."""
+        key = GENERATION_KEY % (schema_name or get_schema_name())
+        return _get_version(self.cache, key)
+
+    def invalidate(self, schema_name=None):
+        """
+        Makes every entry of the schema `schema_name` unreachable by
+        incrementing the schema's generation.
+        """
+        key = GENERATION_KEY % (schema_name or get_schema_name())
+        _increment_versions(self.cache, [key])
+
+    def make_key(self, key, schema_name=None, generation=None):
+        """Returns the namespaced key of `key` in the schema `schema_name`."""
+        schema_name = schema_name or get_schema_name()
+        if generation is None:
+            generation = self.get_generation(schema_name)
+        return '%s:%s:%s' % (schema_name, generation, key)
+
+    def _make_keys(self, keys, schema_name=None):
+        """Returns a dict of the namespaced keys of `keys`."""
+        schema_name = schema_name or get_schema_name()
+        generation = self.get_generation(schema_name)
+        return {
+            key: self.make_key(key, schema_name, generation)
+            for key in keys
+        }
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None,
+            schema_name=None):
+        return self.cache.add(
+            self.make_key(key, schema_name),
+            value,
+            timeout,
+            version,
+        )
+
+    def get(self, key, default=None, version=None, schema_name=None):
+        return self.cache.get(
+            self.make_key(key, schema_name),
+            default,
+            version,
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None,
+            schema_name=None):
+        self.cache.set(
+            self.make_key(key, schema_name),
+            value,
+            timeout,
+            version,
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None,
+              schema_name=None):
+        return self.cache.touch(
+            self.make_key(key, schema_name),
+            timeout,
+            version,
+        )
+
+    def delete(self, key, version=None, schema_name=None):
+        return self.cache.delete(self.make_key(key, schema_name), version)
+
+    def get_many(self, keys, version=None, schema_name=None):
+        namespaced = self._make_keys(keys, schema_name)
+        values = self.cache.get_many(namespaced.values(), version)
+        return {
+            key: values[namespaced_key]
+            for key, namespaced_key in namespaced.items()
+            if namespaced_key in values
+        }
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None,
+                   schema_name=None):
+        return self.cache.get_or_set(
+            self.make_key(key, schema_name),
+            default,
+            timeout,
+            version,
+        )
+
+    def has_key(self, key, version=None, schema_name=None):
+        return self.cache.has_key(self.make_key(key, schema_name), version)
+
+    def incr(self, key, delta=1, version=None, schema_name=None):
+        return self.cache.incr(self.make_key(key, schema_name), delta, version)
+
+    def decr(self, key, delta=1, version=None, schema_name=None):
+        return self.cache.decr(self.make_key(key, schema_name), delta, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None,
+                 schema_name=None):
+        namespaced = self._make_keys(data, schema_name)
+        failed = self.cache.set_many(
+            {namespaced[key]: value for key, value in data.items()},
+            timeout,
+            version,
+        )
+        original = {value: key for key, value in namespaced.items()}
+        return [original[key] for key in failed or ()]
+
+    def delete_many(self, keys, version=None, schema_name=None):
+        self.cache.delete_many(
+            self._make_keys(keys, schema_name).values(),
+            version,
+        )
+
+
+def get_tenant_cache(alias='default'):
+    """Returns a `TenantCache` wrapping the cache `alias`."""
+    return TenantCache(caches[alias])
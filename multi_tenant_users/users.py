@@ -1,4 +1,7 @@
 """Defines multi-tenant authorization functionality."""
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.models import UserManager
 from django.contrib.auth.base_user import AbstractBaseUser
@@ -8,6 +11,13 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .cache import (
+    get_cached_tenant_ids,
+    get_membership_cache,
+    get_tenant_ids_version,
+    set_cached_tenant_ids,
+)
+from .instrumentation import instrument, record_cache_access
 from .permissions import TenantPermissionsDelegator
 
 
@@ -96,3 +106,94 @@ class TenantUser(AbstractBaseUser, TenantPermissionsDelegator):
 
     class Meta:
         abstract = True
+
+    def is_member_of(self, tenant):
+        """Returns whether this user belongs to `tenant`."""
+        return self.has_tenant(tenant.pk)
+
+    async def ais_member_of(self, tenant):
+        """See `is_member_of()`."""
+        if '_tenant_ids' in self.__dict__:
+            return self.is_member_of(tenant)
+        memberships = self.__dict__.get('_tenant_membership_cache', {})
+        if tenant.pk in memberships:
+            return memberships[tenant.pk]
+        return await sync_to_async(self.is_member_of)(tenant)
+
+    @property
+    def tenant_ids(self):
+        """
+        The sorted tuple of IDs of the tenants this user belongs to.
+
+        The IDs are memoized on the user instance and, if
+        `settings.MULTI_TENANT_USERS_MEMBERSHIP_CACHE` is set, read from that
+        cache, so listing a user's tenants doesn't query the database once
+        they're cached.
+        """
+        tenant_ids = self.__dict__.get('_tenant_ids')
+        if tenant_ids is None:
+            tenant_ids = self._get_cached_tenant_ids()
+            if tenant_ids is None:
+                tenant_ids = self._load_tenant_ids()
+            self.__dict__['_tenant_ids'] = tenant_ids
+        return tenant_ids
+
+    def has_tenant(self, tenant_id):
+        """
+        Returns whether this user belongs to the tenant with ID `tenant_id`.
+
+        If the user's `tenant_ids` are memoized or
+        `settings.MULTI_TENANT_USERS_MEMBERSHIP_CACHE` is set, they're
+        searched with a binary search. Otherwise, a single EXISTS query is
+        made against the `tenants` through table's unique index, and the
+        answer is memoized on the user instance.
+        """
+        if (
+            '_tenant_ids' in self.__dict__
+            or get_membership_cache() is not None
+        ):
+            tenant_ids = self.tenant_ids
+            i = bisect_left(tenant_ids, tenant_id)
+            return i < len(tenant_ids) and tenant_ids[i] == tenant_id
+
+        memberships = self.__dict__.setdefault('_tenant_membership_cache', {})
+        if tenant_id not in memberships:
+            field = self._meta.get_field('tenants')
+            through = field.remote_field.through
+            with instrument('has_tenant'):
+                memberships[tenant_id] = through.objects.filter(**{
+                    field.m2m_field_name(): self.pk,
+                    field.m2m_reverse_field_name(): tenant_id,
+                }).exists()
+        return memberships[tenant_id]
+
+    def clear_tenant_membership_cache(self):
+        """Discards the tenant memberships memoized on this user instance."""
+        self.__dict__.pop('_tenant_membership_cache', None)
+        self.__dict__.pop('_tenant_ids', None)
+
+    def _get_cached_tenant_ids(self):
+        """
+        Returns the IDs of the tenants this user belongs to from the membership
+        cache, loading them into the cache if necessary, or None if membership
+        caching is disabled.
+        """
+        if get_membership_cache() is None:
+            return None
+        version = get_tenant_ids_version(self.pk)
+        tenant_ids = get_cached_tenant_ids(self.pk, version)
+        record_cache_access('memberships', tenant_ids is not None)
+        if tenant_ids is None:
+            tenant_ids = self._load_tenant_ids()
+            set_cached_tenant_ids(self.pk, version, tenant_ids)
+        return tenant_ids
+
+    def _load_tenant_ids(self):
+        """
+        Returns the sorted tuple of IDs of the tenants this user belongs to
+        from the database.
+        """
+        with instrument('load_tenant_ids'):
+            return tuple(
+                self.tenants.order_by('pk').values_list('pk', flat=True)
+            )
@@ -1,11 +1,43 @@
 """Defines utility functions for multi-tenant user environments."""
+from collections import namedtuple
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
 from django.apps import apps
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from .bitmaps import encode_permissions, use_permission_bitmaps
+from .cache import (
+    PERMISSION_BITMAP_KEY,
+    get_permissions_version,
+    invalidate_permissions,
+    invalidate_tenant_ids,
+    set_cached_permissions,
+)
+from .compat import get_schema_name, schema_context
+from .instrumentation import instrument, instrument_in_tenant
+
+DEFAULT_BATCH_SIZE = 1000
 
-from .compat import schema_context
+# Resolved by `load_permissions_model()` when the app registry is ready.
+PERMISSIONS_MODEL = None
+GROUP_PERMISSIONS_QUERY = None
 
+BulkAddResult = namedtuple('BulkAddResult', ['created', 'existing'])
+BulkRemoveResult = namedtuple('BulkRemoveResult', ['removed', 'missing'])
+AddUserToTenantsResult = namedtuple(
+    'AddUserToTenantsResult',
+    ['created', 'existing', 'failed'],
+)
+SyncResult = namedtuple('SyncResult', ['added', 'removed', 'missing'])
 
+
+@instrument_in_tenant('add_user')
 @transaction.atomic
 def add_user(user=None, tenant=None, **kwargs):
     user.tenants.add(tenant)
@@ -18,10 +50,280 @@ def add_user(user=None, tenant=None, **kwargs):
             permissions.save()
 
 
+async def aadd_user(user=None, tenant=None, **kwargs):
+    """See `add_user()`."""
+    return await sync_to_async(add_user)(user=user, tenant=tenant, **kwargs)
+
+
+@instrument('add_user_to_tenants')
+def add_user_to_tenants(user, tenants, atomic=True, **kwargs):
+    """
+    Adds `user` to each of `tenants`.
+
+    Each tenant's schema is visited once, in schema name order, to create the
+    user's permissions object with `kwargs` as its field values if it doesn't
+    exist yet. The tenant memberships of all tenants that succeeded are then
+    inserted into the `TenantUser.tenants` through table at once.
+
+    If `atomic` is True, all tenants are processed in a single transaction
+    that is rolled back entirely if any tenant fails. Otherwise, each tenant
+    is processed in its own transaction and failed tenants don't affect the
+    others.
+
+    Returns an `AddUserToTenantsResult` of the tenants in which the user's
+    permissions object was `created` or `existing` and a `failed` dict mapping
+    tenants to the exceptions raised while processing them. When a failure
+    rolls back an atomic run, `created` and `existing` are empty.
+    """
+    tenants_by_schema = {tenant.schema_name: tenant for tenant in tenants}
+    result = AddUserToTenantsResult(created=[], existing=[], failed={})
+
+    with transaction.atomic() if atomic else _noop_context():
+        PermissionsModel = get_permissions_model()
+        for schema_name in sorted(tenants_by_schema):
+            tenant = tenants_by_schema[schema_name]
+            try:
+                with transaction.atomic(), schema_context(schema_name):
+                    permissions = PermissionsModel.objects.filter(
+                        user_id=user.id,
+                    )
+                    if permissions.exists():
+                        result.existing.append(tenant)
+                    else:
+                        PermissionsModel.objects.create(user=user, **kwargs)
+                        result.created.append(tenant)
+            except Exception as e:
+                result.failed[tenant] = e
+
+        if atomic and result.failed:
+            transaction.set_rollback(True)
+            return result._replace(created=[], existing=[])
+
+        _bulk_create_memberships(
+            [
+                (user.id, tenant.pk)
+                for tenant in result.created + result.existing
+            ],
+            DEFAULT_BATCH_SIZE,
+        )
+        user.clear_tenant_membership_cache()
+
+    return result
+
+
+@instrument_in_tenant('bulk_add_users')
+@transaction.atomic
+def bulk_add_users(users, tenant, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """
+    Adds many users to `tenant` at once.
+
+    `users` may contain user instances or user IDs. Tenant memberships are
+    inserted in bulk and permissions objects are created in bulk, with
+    `kwargs` as their field values, for the users that don't have one yet.
+    Conflicting rows are ignored, so the function is safe to retry. All
+    queries are issued in batches of `batch_size` rows.
+
+    Returns a `BulkAddResult` of the IDs of the users whose permissions objects
+    were `created` and of those whose permissions objects were `existing`.
+    """
+    user_ids = _get_user_ids(users)
+    _bulk_create_memberships(
+        [(user_id, tenant.pk) for user_id in user_ids],
+        batch_size,
+    )
+
+    with schema_context(tenant.schema_name):
+        PermissionsModel = get_permissions_model()
+        existing = set()
+        for batch in _batches(user_ids, batch_size):
+            existing.update(
+                PermissionsModel.objects
+                .filter(user_id__in=batch)
+                .values_list('user_id', flat=True)
+            )
+        created = [user_id for user_id in user_ids if user_id not in existing]
+        PermissionsModel.objects.bulk_create(
+            [
+                PermissionsModel(user_id=user_id, **kwargs)
+                for user_id in created
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        # bulk_create() doesn't send post_save.
+        invalidate_permissions(tenant.schema_name)
+
+    return BulkAddResult(
+        created=created,
+        existing=[user_id for user_id in user_ids if user_id in existing],
+    )
+
+
+@instrument_in_tenant('bulk_remove_users')
+@transaction.atomic
+def bulk_remove_users(users, tenant, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Removes many users from `tenant` at once.
+
+    `users` may contain user instances or user IDs. Tenant memberships and
+    permissions objects are deleted in batches of `batch_size` users.
+
+    Returns a `BulkRemoveResult` of the IDs of the users whose permissions
+    objects were `removed` and of those who had none and were `missing`.
+    """
+    # Imported here because it depends on this module.
+    from .effective import deferred_refresh
+
+    user_ids = _get_user_ids(users)
+    through, user_field, tenant_field = _get_memberships_through()
+    for batch in _batches(user_ids, batch_size):
+        through.objects.filter(**{
+            '%s__in' % user_field: batch,
+            tenant_field: tenant.pk,
+        }).delete()
+    invalidate_tenant_ids(user_ids)
+
+    # Deleting permissions objects sends post_delete for each of them, whose
+    # receiver would refresh each user's effective permissions separately.
+    with schema_context(tenant.schema_name), deferred_refresh():
+        PermissionsModel = get_permissions_model()
+        removed = set()
+        for batch in _batches(user_ids, batch_size):
+            permissions = PermissionsModel.objects.filter(user_id__in=batch)
+            removed.update(permissions.values_list('user_id', flat=True))
+            permissions.delete()
+
+    return BulkRemoveResult(
+        removed=[user_id for user_id in user_ids if user_id in removed],
+        missing=[user_id for user_id in user_ids if user_id not in removed],
+    )
+
+
+@instrument_in_tenant('get_permissions_for_users')
+def get_permissions_for_users(users, tenant=None, warm_cache=False):
+    """
+    Returns a dict mapping the IDs of `users` to the sets of permission
+    strings they have in `tenant`, or in the current tenant if `tenant` is
+    None.
+
+    `users` may contain user instances or user IDs. The permission sets are
+    computed with at most four queries however many users there are: one for
+    the users' permissions objects, one for their direct permissions, one for
+    their group permissions, and, if any of them is a superuser, one for all
+    permissions. Inactive user instances get no permissions.
+
+    If `warm_cache` is True, the permission sets are also stored in the shared
+    permissions cache, if it's enabled, so that later permission checks for
+    these users don't query the database.
+    """
+    users = list(users)
+    user_ids = _get_user_ids(users)
+    inactive = {
+        user.pk for user in users if getattr(user, 'is_active', True) is False
+    }
+    result = {user_id: set() for user_id in user_ids}
+
+    context = schema_context(tenant.schema_name) if tenant else _noop_context()
+    with context:
+        schema_name = get_schema_name()
+        version = get_permissions_version(schema_name) if warm_cache else None
+
+        PermissionsModel = get_permissions_model()
+        rows = dict(
+            PermissionsModel.objects
+            .filter(user_id__in=user_ids)
+            .exclude(user_id__in=inactive)
+            .values_list('user_id', 'is_superuser')
+        )
+
+        superusers = [user_id for user_id, is_su in rows.items() if is_su]
+        if superusers:
+            all_perms = {
+                '%s.%s' % (ct, name)
+                for ct, name in Permission.objects.values_list(
+                    'content_type__app_label',
+                    'codename',
+                )
+            }
+            for user_id in superusers:
+                result[user_id] = set(all_perms)
+
+        users_query = '%s__user_id' % (
+            PermissionsModel._meta.get_field('groups').m2m_field_name()
+        )
+        others = [user_id for user_id, is_su in rows.items() if not is_su]
+        assignments = (
+            (PermissionsModel.user_permissions.through, 'permission__'),
+            (PermissionsModel.groups.through, 'group__permissions__'),
+        )
+        for through, permission_query in assignments:
+            perms = through.objects.filter(**{
+                '%s__in' % users_query: others,
+                '%scodename__isnull' % permission_query: False,
+            }).values_list(
+                users_query,
+                '%scontent_type__app_label' % permission_query,
+                '%scodename' % permission_query,
+            )
+            for user_id, ct, name in perms:
+                result[user_id].add('%s.%s' % (ct, name))
+
+        if warm_cache:
+            for user_id in rows:
+                _warm_permissions_cache(
+                    schema_name,
+                    user_id,
+                    version,
+                    result[user_id],
+                )
+
+    return result
+
+
 def get_permissions_model():
+    """
+    Returns the model specified by
+    `settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL`.
+
+    The model is resolved once, when the app registry is ready, and read from
+    `PERMISSIONS_MODEL` afterwards.
+    """
+    if PERMISSIONS_MODEL is None:
+        load_permissions_model()
+    return PERMISSIONS_MODEL
+
+
+def get_group_permissions_query():
+    """
+    Returns the lookup from `Permission` to the permissions instances that
+    have it through their groups, such as "group__tenant_permissions".
+    """
+    if GROUP_PERMISSIONS_QUERY is None:
+        load_permissions_model()
+    return GROUP_PERMISSIONS_QUERY
+
+
+def get_group_ids(user_id):
+    """
+    Returns a queryset of the IDs of the groups the user with ID `user_id`
+    belongs to in the current schema, for use as a subquery.
+    """
+    field = get_permissions_model()._meta.get_field('groups')
+    return field.remote_field.through.objects.filter(
+        **{'%s__user_id' % field.m2m_field_name(): user_id}
+    ).values(field.m2m_reverse_field_name())
+
+
+def load_permissions_model():
+    """
+    Resolves the model specified by
+    `settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL` and the query paths derived
+    from it, and stores them in the module constants.
+    """
+    global PERMISSIONS_MODEL, GROUP_PERMISSIONS_QUERY
     try:
         model_name = settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL
-        return apps.get_model(model_name, require_ready=False)
+        PermissionsModel = apps.get_model(model_name, require_ready=False)
     except AttributeError:
         raise ImproperlyConfigured(
             _('MULTI_TENANT_USERS_PERMISSIONS_MODEL '
@@ -32,8 +334,63 @@ def get_permissions_model():
             _('Failed to import the model specified in '
               'settings.MULTI_TENANT_USERS_PERMISSIONS_MODEL.')
         )
+    groups_field = PermissionsModel._meta.get_field('groups')
+    PERMISSIONS_MODEL = PermissionsModel
+    GROUP_PERMISSIONS_QUERY = 'group__%s' % groups_field.related_query_name()
+
 
+def reset_permissions_model():
+    """
+    Discards the resolved permissions model so that it's resolved again on
+    next use, for example after settings are overridden in tests.
+    """
+    global PERMISSIONS_MODEL, GROUP_PERMISSIONS_QUERY
+    PERMISSIONS_MODEL = None
+    GROUP_PERMISSIONS_QUERY = None
 
+
+@instrument_in_tenant('sync_tenant_groups')
+def sync_tenant_groups(assignments, tenant=None,
+                       batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Replaces the groups of many users in `tenant`, or in the current tenant if
+    `tenant` is None, at once.
+
+    `assignments` maps user IDs to the groups, or group IDs, each user should
+    belong to. See `sync_tenant_user_permissions()`.
+    """
+    return _sync_tenant_m2m('groups', assignments, tenant, batch_size)
+
+
+@instrument_in_tenant('sync_tenant_user_permissions')
+def sync_tenant_user_permissions(assignments, tenant=None,
+                                 batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Replaces the direct permissions of many users in `tenant`, or in the
+    current tenant if `tenant` is None, at once.
+
+    `assignments` maps user IDs to the permissions, or permission IDs, each
+    user should have. The users' current assignments are read from the
+    through table and compared with `assignments`, and only the difference is
+    inserted and deleted, in bulk and in a single transaction. All queries
+    are issued in batches of `batch_size` users or rows. Because no
+    `m2m_changed` signals are sent, cached permissions of the tenant are
+    invalidated explicitly.
+
+    Returns a `SyncResult` of dicts mapping the IDs of changed users to the
+    sorted IDs `added` to and `removed` from their assignments, and the
+    `missing` IDs of users without a permissions object in the tenant, who
+    are skipped.
+    """
+    return _sync_tenant_m2m(
+        'user_permissions',
+        assignments,
+        tenant,
+        batch_size,
+    )
+
+
+@instrument_in_tenant('remove_user')
 @transaction.atomic
 def remove_user(user=None, tenant=None):
     user.tenants.remove(tenant)
@@ -42,3 +399,157 @@ def remove_user(user=None, tenant=None):
         permissions = PermissionsModel.objects.filter(user_id=user.id).first()
         if permissions:
             permissions.delete()
+
+
+async def aremove_user(user=None, tenant=None):
+    """See `remove_user()`."""
+    return await sync_to_async(remove_user)(user=user, tenant=tenant)
+
+
+def _batches(items, batch_size):
+    """Yields successive slices of `items` of at most `batch_size` items."""
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def _bulk_create_memberships(memberships, batch_size):
+    """
+    Inserts `memberships`, pairs of user and tenant IDs, into the
+    `TenantUser.tenants` through table, ignoring existing ones.
+    """
+    through, user_field, tenant_field = _get_memberships_through()
+    through.objects.bulk_create(
+        [
+            through(**{user_field: user_id, tenant_field: tenant_id})
+            for user_id, tenant_id in memberships
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    # bulk_create() doesn't send m2m_changed.
+    invalidate_tenant_ids({user_id for user_id, tenant_id in memberships})
+
+
+def _sync_tenant_m2m(field_name, assignments, tenant, batch_size):
+    """
+    Replaces the objects related to users' permissions objects through the
+    many-to-many field `field_name` with `assignments`. See
+    `sync_tenant_user_permissions()`.
+    """
+    assignments = {
+        user_id: {getattr(obj, 'pk', obj) for obj in objs}
+        for user_id, objs in assignments.items()
+    }
+    added = {}
+    removed = {}
+
+    context = schema_context(tenant.schema_name) if tenant else _noop_context()
+    with context, transaction.atomic():
+        PermissionsModel = get_permissions_model()
+        field = PermissionsModel._meta.get_field(field_name)
+        through = field.remote_field.through
+        owner_field = field.m2m_column_name()
+        target_field = field.m2m_reverse_name()
+
+        owners = {}
+        for batch in _batches(list(assignments), batch_size):
+            owners.update(
+                PermissionsModel.objects
+                .filter(user_id__in=batch)
+                .values_list('pk', 'user_id')
+            )
+
+        current = {owner_id: {} for owner_id in owners}
+        for batch in _batches(list(owners), batch_size):
+            rows = through.objects.filter(**{
+                '%s__in' % owner_field: batch,
+            }).values_list('pk', owner_field, target_field)
+            for pk, owner_id, target_id in rows:
+                current[owner_id][target_id] = pk
+
+        stale = []
+        new = []
+        for owner_id, user_id in owners.items():
+            existing = current[owner_id]
+            wanted = assignments[user_id]
+            missing_ids = wanted.difference(existing)
+            stale_ids = set(existing).difference(wanted)
+            if missing_ids:
+                added[user_id] = sorted(missing_ids)
+                new.extend(
+                    through(**{owner_field: owner_id, target_field: target_id})
+                    for target_id in missing_ids
+                )
+            if stale_ids:
+                removed[user_id] = sorted(stale_ids)
+                stale.extend(existing[target_id] for target_id in stale_ids)
+
+        for batch in _batches(stale, batch_size):
+            through.objects.filter(pk__in=batch).delete()
+        through.objects.bulk_create(
+            new,
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+        if added or removed:
+            # Imported here because it depends on this module.
+            from .effective import refresh_effective_permissions
+
+            # Neither bulk operation sends m2m_changed.
+            invalidate_permissions(get_schema_name())
+            refresh_effective_permissions(set(added) | set(removed))
+
+    found = set(owners.values())
+    return SyncResult(
+        added=added,
+        removed=removed,
+        missing=[user_id for user_id in assignments if user_id not in found],
+    )
+
+
+@contextmanager
+def _noop_context():
+    yield
+
+
+def _warm_permissions_cache(schema_name, user_id, version, permissions):
+    """
+    Stores the permission set `permissions` of the user with ID `user_id` in
+    the shared permissions cache, as a bitmap if bitmaps are enabled.
+    """
+    if use_permission_bitmaps():
+        set_cached_permissions(
+            schema_name,
+            user_id,
+            version,
+            encode_permissions(permissions),
+            key=PERMISSION_BITMAP_KEY,
+        )
+    else:
+        set_cached_permissions(schema_name, user_id, version, permissions)
+
+
+def _get_memberships_through():
+    """
+    Returns the through model of `TenantUser.tenants` and the names of its
+    user and tenant foreign key columns.
+    """
+    field = get_user_model()._meta.get_field('tenants')
+    return (
+        field.remote_field.through,
+        field.m2m_column_name(),
+        field.m2m_reverse_name(),
+    )
+
+
+def _get_user_ids(users):
+    """Returns the distinct IDs of `users`, which may be instances or IDs."""
+    user_ids = []
+    seen = set()
+    for user in users:
+        user_id = getattr(user, 'pk', user)
+        if user_id not in seen:
+            seen.add(user_id)
+            user_ids.append(user_id)
+    return user_ids
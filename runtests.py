@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+"""Runs the test suite. Arguments are passed on to Django's test runner."""
+import os
+import sys
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+
+def main():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+    TestRunner = get_runner(settings)
+    failures = TestRunner().run_tests(sys.argv[1:] or ['tests'])
+    sys.exit(bool(failures))
+
+
+if __name__ == '__main__':
+    main()
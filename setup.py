@@ -1,5 +1,5 @@
 import os
-from setuptools import setup
+from setuptools import find_packages, setup
 
 
 
@@ -19,25 +19,31 @@ setup(
     author='Bitsick Productions LLC',
     author_email='contact@bitsick.com',
 
-    packages=['multi_tenant_users'],
+    packages=find_packages(
+        include=['multi_tenant_users', 'multi_tenant_users.*'],
+    ),
     include_package_data=True,
-    install_requires=['Django >= 1.11'],
+    python_requires='>= 3.7',
+    install_requires=['Django >= 3.0', 'asgiref >= 3.6'],
 
     keywords='django tenants django-tenants django-tenant-schemas',
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Web Environment',
         'Framework :: Django',
-        'Framework :: Django :: 1.11',
-        'Framework :: Django :: 2.0',
+        'Framework :: Django :: 3.0',
+        'Framework :: Django :: 3.1',
+        'Framework :: Django :: 3.2',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: Apache Software License',
         'Natural Language :: English',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
         'Topic :: Internet :: WWW/HTTP',
         'Topic :: Internet :: WWW/HTTP :: Dynamic Content',
     ]
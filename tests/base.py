@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from .users.models import Tenant, User
+
+
+class TenantsTestCase(TestCase):
+    """
+    A test case with two tenants, `tenant` and `other`, whose tests start with
+    the connection set to the public schema and an empty cache.
+    """
+    @classmethod
+    def setUpClass(cls):
+        # Schemas are created outside of the test case's transactions.
+        connection.set_schema_to_public()
+        cls.tenant = Tenant(schema_name='test', name='Test')
+        cls.tenant.save(verbosity=0)
+        cls.other = Tenant(schema_name='other', name='Other')
+        cls.other.save(verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connection.set_schema_to_public()
+        cls.tenant.delete(force_drop=True)
+        cls.other.delete(force_drop=True)
+
+    def setUp(self):
+        connection.set_schema_to_public()
+        cache.clear()
+
+    def create_user(self, username):
+        return User.objects.create_user(username, '%s@example.com' % username)
+
+    @contextmanager
+    def capture_on_commit_callbacks(self, execute=False):
+        """
+        Captures the callbacks registered with `transaction.on_commit()` in the
+        block into the yielded list, and calls them on exit if `execute` is
+        true. Works like `captureOnCommitCallbacks()` from Django 3.2.
+        """
+        callbacks = []
+        start = len(connection.run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            # Entries start with the savepoint IDs and the callback.
+            callbacks[:] = [
+                entry[1] for entry in connection.run_on_commit[start:]
+            ]
+            if execute:
+                for callback in callbacks:
+                    callback()
+
+    def reload(self, user):
+        """Returns a new instance of `user`, as a new request would load."""
+        return User.objects.get(pk=user.pk)
+
+
+def get_current_schema():
+    """Returns the schema the default connection's queries run in."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT current_schema()')
+        return cursor.fetchone()[0]
@@ -0,0 +1,17 @@
+from multi_tenant_users.effective import AbstractEffectivePermission
+from multi_tenant_users.object_permissions import AbstractObjectPermission
+from multi_tenant_users.permissions import TenantPermissionsMixin
+
+
+class TenantPermissions(TenantPermissionsMixin):
+    @property
+    def is_active(self):
+        return self.user.is_active
+
+
+class EffectivePermission(AbstractEffectivePermission):
+    pass
+
+
+class ObjectPermission(AbstractObjectPermission):
+    pass
@@ -0,0 +1,58 @@
+"""Settings for running the test suite against PostgreSQL with django-tenants.
+
+The database connection can be configured with the `POSTGRES_HOST`,
+`POSTGRES_PORT`, `POSTGRES_USER`, `POSTGRES_PASSWORD`, and `POSTGRES_DB`
+environment variables, which default to the server in `docker-compose.yml`.
+"""
+import os
+
+SECRET_KEY = 'multi_tenant_users-tests'
+
+SHARED_APPS = [
+    'django_tenants',
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'django.contrib.sessions',
+    'multi_tenant_users',
+    'tests.users',
+]
+
+TENANT_APPS = [
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'tests.permissions',
+]
+
+INSTALLED_APPS = SHARED_APPS + [
+    app for app in TENANT_APPS if app not in SHARED_APPS
+]
+
+TENANT_MODEL = 'users.Tenant'
+TENANT_DOMAIN_MODEL = 'users.Domain'
+TENANT_LIMIT_SET_CALLS = True
+
+AUTH_USER_MODEL = 'users.User'
+AUTHENTICATION_BACKENDS = ['multi_tenant_users.backends.ModelBackend']
+MULTI_TENANT_USERS_PERMISSIONS_MODEL = 'permissions.TenantPermissions'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django_tenants.postgresql_backend',
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', 5432),
+        'NAME': os.environ.get('POSTGRES_DB', 'multi_tenant_users'),
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'password'),
+    }
+}
+
+DATABASE_ROUTERS = ['django_tenants.routers.TenantSyncRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+USE_TZ = True
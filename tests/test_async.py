@@ -0,0 +1,51 @@
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from multi_tenant_users.compat import run_in_schema
+from multi_tenant_users.context import tenant_context
+from multi_tenant_users.middleware import TenantContextMiddleware
+
+from .base import TenantsTestCase, get_current_schema
+
+
+class RunInSchemaTests(TenantsTestCase):
+    def test_requires_bound_schema(self):
+        connection.set_tenant(self.tenant)
+        with self.assertRaises(ImproperlyConfigured):
+            async_to_sync(run_in_schema)(get_current_schema)
+
+    def test_runs_in_bound_schema(self):
+        async def main():
+            with tenant_context('other'):
+                return await run_in_schema(get_current_schema)
+
+        connection.set_tenant(self.tenant)
+        self.assertEqual(async_to_sync(main)(), 'other')
+        self.assertEqual(get_current_schema(), 'test')
+
+
+class TenantContextMiddlewareTests(TenantsTestCase):
+    def get_request(self):
+        request = RequestFactory().get('/')
+        request.tenant = self.other
+        return request
+
+    def test_sync_view(self):
+        def view(request):
+            return HttpResponse(get_current_schema())
+
+        response = TenantContextMiddleware(view)(self.get_request())
+        self.assertEqual(response.content, b'other')
+        self.assertEqual(get_current_schema(), 'public')
+
+    def test_async_view(self):
+        async def view(request):
+            schema_name = await run_in_schema(get_current_schema)
+            return HttpResponse(schema_name)
+
+        middleware = TenantContextMiddleware(view)
+        response = async_to_sync(middleware)(self.get_request())
+        self.assertEqual(response.content, b'other')
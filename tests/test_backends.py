@@ -0,0 +1,73 @@
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.test import override_settings
+
+from multi_tenant_users.cache import (
+    PERMISSION_BITMAP_KEY,
+    get_permissions_version,
+    set_cached_permissions,
+)
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.permissions import preload_tenant_permissions
+from multi_tenant_users.utils import add_user
+
+from .base import TenantsTestCase
+
+
+@override_settings(MULTI_TENANT_USERS_PERMISSION_BITMAPS=True)
+class PermissionBitmapTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        add_user(self.user, self.tenant)
+
+    def create_permission(self, codename):
+        # bulk_create() sends no signals, so the registry isn't reset.
+        Permission.objects.bulk_create([Permission(
+            codename=codename,
+            name=codename,
+            content_type=ContentType.objects.get_for_model(Permission),
+        )])
+        return Permission.objects.get(codename=codename)
+
+    def test_permission_unknown_to_registry(self):
+        with schema_context('test'):
+            self.assertFalse(self.reload(self.user).has_perm('auth.add_group'))
+            permission = self.create_permission('new_permission')
+            self.user.tenant_permissions.user_permissions.add(permission)
+            user = self.reload(self.user)
+            self.assertTrue(user.has_perm('auth.new_permission'))
+            self.assertEqual(
+                user.get_all_permissions(),
+                {'auth.new_permission'},
+            )
+
+    @override_settings(MULTI_TENANT_USERS_PERMISSIONS_CACHE='default')
+    def test_cached_bitmap_with_unknown_bits(self):
+        with schema_context('test'):
+            self.assertFalse(self.reload(self.user).has_perm('auth.add_group'))
+            permission = self.create_permission('new_permission')
+            # Another process that knows the permission caches the bitmap.
+            set_cached_permissions(
+                'test',
+                self.user.pk,
+                get_permissions_version('test'),
+                1 << permission.pk,
+                key=PERMISSION_BITMAP_KEY,
+            )
+            user = self.reload(self.user)
+            self.assertTrue(user.has_perm('auth.new_permission'))
+            self.assertTrue(user.has_module_perms('auth'))
+
+    def test_preloaded_permissions(self):
+        with schema_context('test'):
+            self.user.tenant_permissions.user_permissions.add(
+                Permission.objects.get(codename='add_group'),
+            )
+            self.assertTrue(self.reload(self.user).has_perm('auth.add_group'))
+            user = self.reload(self.user)
+            preload_tenant_permissions(user)
+            with self.assertNumQueries(0):
+                self.assertTrue(user.has_perm('auth.add_group'))
+                self.assertFalse(user.has_perm('auth.delete_group'))
+                self.assertTrue(user.has_module_perms('auth'))
@@ -0,0 +1,72 @@
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.utils import (
+    add_user,
+    bulk_add_users,
+    bulk_remove_users,
+)
+
+from .base import TenantsTestCase
+from .permissions.models import TenantPermissions
+
+
+class BulkAddUsersTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [self.create_user('user%d' % i) for i in range(3)]
+        self.user_ids = [user.pk for user in self.users]
+
+    def get_permissions(self, schema_name):
+        with schema_context(schema_name):
+            return dict(TenantPermissions.objects.values_list(
+                'user_id',
+                'is_superuser',
+            ))
+
+    def test_adds_users(self):
+        result = bulk_add_users(self.users, self.tenant, is_superuser=True)
+        self.assertEqual(result.created, self.user_ids)
+        self.assertEqual(result.existing, [])
+        for user in self.users:
+            self.assertEqual(self.reload(user).tenant_ids, (self.tenant.pk,))
+        self.assertEqual(
+            self.get_permissions('test'),
+            {user_id: True for user_id in self.user_ids},
+        )
+        self.assertEqual(self.get_permissions('other'), {})
+
+    def test_skips_existing_users(self):
+        add_user(self.users[0], self.tenant)
+        result = bulk_add_users(self.user_ids, self.tenant, batch_size=2)
+        self.assertEqual(result.created, self.user_ids[1:])
+        self.assertEqual(result.existing, self.user_ids[:1])
+        self.assertEqual(set(self.get_permissions('test')), set(self.user_ids))
+
+    def test_is_safe_to_retry(self):
+        bulk_add_users(self.users, self.tenant)
+        result = bulk_add_users(self.users, self.tenant)
+        self.assertEqual(result.created, [])
+        self.assertEqual(result.existing, self.user_ids)
+        self.assertEqual(
+            self.users[0].tenants.through.objects.count(),
+            len(self.users),
+        )
+
+
+class BulkRemoveUsersTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [self.create_user('user%d' % i) for i in range(3)]
+        self.user_ids = [user.pk for user in self.users]
+        bulk_add_users(self.users[:2], self.tenant)
+        bulk_add_users(self.users[:2], self.other)
+
+    def test_removes_users(self):
+        result = bulk_remove_users(self.users, self.tenant, batch_size=2)
+        self.assertEqual(result.removed, self.user_ids[:2])
+        self.assertEqual(result.missing, self.user_ids[2:])
+        for user in self.users[:2]:
+            self.assertEqual(self.reload(user).tenant_ids, (self.other.pk,))
+        with schema_context('test'):
+            self.assertFalse(TenantPermissions.objects.exists())
+        with schema_context('other'):
+            self.assertEqual(TenantPermissions.objects.count(), 2)
@@ -0,0 +1,60 @@
+from django.contrib.auth.models import Permission
+from django.test import override_settings
+
+from multi_tenant_users.cache import (
+    get_permissions_version,
+    set_cached_permissions,
+)
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.utils import add_user
+
+from .base import TenantsTestCase
+
+
+@override_settings(MULTI_TENANT_USERS_PERMISSIONS_CACHE='default')
+class PermissionsCacheTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        add_user(self.user, self.tenant)
+        add_user(self.user, self.other)
+
+    def grant(self, user, codename):
+        permissions = user.tenant_permissions
+        permissions.user_permissions.add(
+            Permission.objects.get(codename=codename),
+        )
+
+    def test_assignment_invalidates_after_commit(self):
+        with schema_context('test'):
+            self.assertFalse(self.reload(self.user).has_perm('auth.add_group'))
+            version = get_permissions_version('test')
+            with self.capture_on_commit_callbacks() as callbacks:
+                self.grant(self.reload(self.user), 'add_group')
+            self.assertEqual(get_permissions_version('test'), version)
+            # Before the commit, later requests still read the cached set.
+            self.assertFalse(self.reload(self.user).has_perm('auth.add_group'))
+
+            for callback in callbacks:
+                callback()
+            self.assertNotEqual(get_permissions_version('test'), version)
+            self.assertTrue(self.reload(self.user).has_perm('auth.add_group'))
+
+    def test_sets_cached_before_commit_are_not_served(self):
+        with schema_context('test'):
+            version = get_permissions_version('test')
+            with self.capture_on_commit_callbacks(execute=True):
+                self.grant(self.reload(self.user), 'add_group')
+            # A request that loaded the permissions before the commit caches
+            # them afterwards.
+            set_cached_permissions('test', self.user.pk, version, set())
+            self.assertTrue(self.reload(self.user).has_perm('auth.add_group'))
+
+    def test_other_tenants_are_not_invalidated(self):
+        version = get_permissions_version('other')
+        with schema_context('test'):
+            with self.capture_on_commit_callbacks(execute=True):
+                self.grant(self.reload(self.user), 'add_group')
+        self.assertEqual(get_permissions_version('other'), version)
+        with schema_context('other'):
+            self.assertFalse(self.reload(self.user).has_perm('auth.add_group'))
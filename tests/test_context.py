@@ -0,0 +1,79 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.context import get_bound_schema_name, tenant_context
+
+from .base import TenantsTestCase, get_current_schema
+
+
+class TenantContextTests(TenantsTestCase):
+    def test_switches_before_first_query(self):
+        with tenant_context('other'):
+            self.assertEqual(connection.schema_name, 'public')
+            self.assertEqual(get_current_schema(), 'other')
+            self.assertEqual(connection.schema_name, 'other')
+
+    def test_block_without_queries_does_not_switch(self):
+        with tenant_context('other'):
+            pass
+        self.assertEqual(connection.schema_name, 'public')
+        self.assertEqual(get_current_schema(), 'public')
+
+    def test_restores_public_schema(self):
+        with tenant_context('other'):
+            get_current_schema()
+        self.assertEqual(get_current_schema(), 'public')
+        self.assertEqual(connection.schema_name, 'public')
+
+    def test_restores_previous_tenant(self):
+        connection.set_tenant(self.tenant)
+        with tenant_context('other'):
+            self.assertEqual(get_current_schema(), 'other')
+        self.assertEqual(get_current_schema(), 'test')
+        self.assertIs(connection.tenant, self.tenant)
+
+    def test_nested_blocks(self):
+        with tenant_context('test'):
+            self.assertEqual(get_current_schema(), 'test')
+            with tenant_context('other'):
+                self.assertEqual(get_current_schema(), 'other')
+            self.assertEqual(get_current_schema(), 'test')
+        self.assertEqual(get_current_schema(), 'public')
+
+    def test_bound_schema_already_active(self):
+        connection.set_tenant(self.tenant)
+        with tenant_context('test'):
+            self.assertEqual(get_current_schema(), 'test')
+        self.assertEqual(get_current_schema(), 'test')
+        self.assertIs(connection.tenant, self.tenant)
+
+    def test_keeps_explicit_switch_after_block(self):
+        with tenant_context('test'):
+            get_current_schema()
+        connection.set_tenant(self.other)
+        self.assertEqual(get_current_schema(), 'other')
+
+    def test_tasks_have_their_own_schemas(self):
+        async def get_schema(schema_name):
+            with tenant_context(schema_name):
+                await asyncio.sleep(0)
+                return await sync_to_async(get_current_schema)()
+
+        async def main():
+            return await asyncio.gather(
+                get_schema('test'),
+                get_schema('other'),
+            )
+
+        self.assertEqual(async_to_sync(main)(), ['test', 'other'])
+        self.assertEqual(get_current_schema(), 'public')
+
+    def test_schema_context_binds_schema(self):
+        with schema_context('other'):
+            self.assertEqual(get_bound_schema_name(), 'other')
+            self.assertEqual(get_current_schema(), 'other')
+        self.assertIsNone(get_bound_schema_name())
+        self.assertEqual(get_current_schema(), 'public')
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.utils import bulk_add_users, bulk_remove_users
+
+from .base import TenantsTestCase
+from .permissions.models import EffectivePermission
+
+
+def count_queries(context):
+    """Returns the number of queries captured by `context`, ignoring SETs."""
+    return sum(
+        not query['sql'].startswith('SET ')
+        for query in context.captured_queries
+    )
+
+
+@override_settings(
+    MULTI_TENANT_USERS_EFFECTIVE_PERMISSIONS_MODEL=(
+        'permissions.EffectivePermission'
+    ),
+)
+class EffectivePermissionTests(TenantsTestCase):
+    def test_bulk_remove_users_refreshes_in_one_batch(self):
+        few = [self.create_user('user%d' % i) for i in range(2)]
+        many = [self.create_user('member%d' % i) for i in range(10)]
+        bulk_add_users(few + many, self.tenant)
+        with schema_context('test'):
+            group = Group.objects.create(name='Editors')
+            group.permissions.add(Permission.objects.get(codename='add_group'))
+            for user in few + many:
+                self.reload(user).tenant_permissions.groups.add(group)
+            self.assertEqual(EffectivePermission.objects.count(), 12)
+
+        with CaptureQueriesContext(connection) as few_queries:
+            bulk_remove_users(few, self.tenant)
+        with CaptureQueriesContext(connection) as many_queries:
+            bulk_remove_users(many, self.tenant)
+        self.assertEqual(
+            count_queries(many_queries),
+            count_queries(few_queries),
+        )
+        with schema_context('test'):
+            self.assertFalse(EffectivePermission.objects.exists())
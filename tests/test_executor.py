@@ -0,0 +1,59 @@
+import threading
+import time
+
+from django.db import connection
+
+from multi_tenant_users.executor import for_each_tenant
+
+from .base import TenantsTestCase, get_current_schema
+
+
+def get_schema(tenant):
+    return get_current_schema()
+
+
+class ForEachTenantTests(TenantsTestCase):
+    def test_rejects_invalid_arguments_when_called(self):
+        with self.assertRaises(ValueError):
+            for_each_tenant(get_schema, [self.tenant], workers=0)
+        with self.assertRaises(ValueError):
+            for_each_tenant(get_schema, [self.tenant], mode='fiber')
+
+    def test_calls_function_in_each_schema(self):
+        results = for_each_tenant(
+            get_schema,
+            [self.tenant, self.other],
+            workers=2,
+        )
+        self.assertEqual(
+            {result.tenant.schema_name: result.result for result in results},
+            {'test': 'test', 'other': 'other'},
+        )
+
+    def test_timeout_outside_database(self):
+        released = threading.Event()
+
+        def hang(tenant):
+            if tenant.schema_name == 'test':
+                # Work that doesn't query the database.
+                released.wait(10)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return tenant.schema_name
+
+        start = time.monotonic()
+        try:
+            results = {
+                result.tenant.schema_name: result
+                for result in for_each_tenant(
+                    hang,
+                    [self.tenant, self.other],
+                    timeout=0.5,
+                )
+            }
+        finally:
+            released.set()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertIsInstance(results['test'].error, TimeoutError)
+        self.assertIsNone(results['other'].error)
+        self.assertEqual(results['other'].result, 'other')
@@ -0,0 +1,46 @@
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.instrumentation import collect
+from multi_tenant_users.utils import (
+    add_user,
+    bulk_add_users,
+    bulk_remove_users,
+    get_permissions_for_users,
+    remove_user,
+)
+
+from .base import TenantsTestCase
+
+
+class InstrumentationTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+
+    def test_operations_are_reported_in_tenant_schema(self):
+        with collect() as collector:
+            add_user(self.user, self.tenant)
+            remove_user(user=self.user, tenant=self.tenant)
+            bulk_add_users([self.user], self.other)
+            bulk_remove_users([self.user], self.other)
+        self.assertEqual(
+            {
+                operation: schema_name
+                for operation, schema_name in collector.operations
+                if operation != 'schema_context'
+            },
+            {
+                'add_user': 'test',
+                'remove_user': 'test',
+                'bulk_add_users': 'other',
+                'bulk_remove_users': 'other',
+            },
+        )
+
+    def test_operations_without_tenant_are_reported_in_current_schema(self):
+        add_user(self.user, self.tenant)
+        with collect() as collector, schema_context('test'):
+            get_permissions_for_users([self.user])
+        self.assertIn(
+            ('get_permissions_for_users', 'test'),
+            collector.operations,
+        )
@@ -0,0 +1,46 @@
+from django.test import override_settings
+
+from multi_tenant_users.cache import (
+    get_tenant_ids_version,
+    set_cached_tenant_ids,
+)
+from multi_tenant_users.utils import add_user, bulk_add_users, remove_user
+
+from .base import TenantsTestCase
+
+
+@override_settings(MULTI_TENANT_USERS_MEMBERSHIP_CACHE='default')
+class MembershipCacheTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        add_user(self.user, self.tenant)
+
+    def test_removal_invalidates_after_commit(self):
+        self.assertTrue(self.reload(self.user).is_member_of(self.tenant))
+        with self.capture_on_commit_callbacks() as callbacks:
+            remove_user(self.user, self.tenant)
+        self.assertTrue(self.reload(self.user).is_member_of(self.tenant))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.reload(self.user).is_member_of(self.tenant))
+
+    def test_bulk_add_invalidates_after_commit(self):
+        self.assertFalse(self.reload(self.user).is_member_of(self.other))
+        with self.capture_on_commit_callbacks(execute=True):
+            bulk_add_users([self.user], self.other)
+        self.assertEqual(
+            self.reload(self.user).tenant_ids,
+            tuple(sorted([self.tenant.pk, self.other.pk])),
+        )
+
+    def test_memberships_cached_before_commit_are_not_served(self):
+        version = get_tenant_ids_version(self.user.pk)
+        with self.capture_on_commit_callbacks(execute=True):
+            remove_user(self.user, self.tenant)
+        # A request that loaded the memberships before the removal committed
+        # caches them afterwards.
+        set_cached_tenant_ids(self.user.pk, version, [self.tenant.pk])
+        self.assertFalse(self.reload(self.user).is_member_of(self.tenant))
+        self.assertEqual(self.reload(self.user).tenant_ids, ())
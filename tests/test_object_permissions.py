@@ -0,0 +1,100 @@
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.test import override_settings
+
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.object_permissions import filter_queryset_by_perm
+from multi_tenant_users.utils import add_user
+
+from .base import TenantsTestCase
+from .permissions.models import ObjectPermission
+
+
+@override_settings(
+    AUTHENTICATION_BACKENDS=[
+        'multi_tenant_users.backends.ModelBackend',
+        'multi_tenant_users.backends.ObjectPermissionBackend',
+    ],
+    MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL='permissions.ObjectPermission',
+)
+class ObjectPermissionTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        add_user(self.user, self.tenant)
+        add_user(self.user, self.other)
+        with schema_context('test'):
+            self.granted = Group.objects.create(name='Editors')
+            self.other_group = Group.objects.create(name='Viewers')
+
+    def grant(self, obj, user=None, group=None):
+        ObjectPermission.objects.create(
+            user=user,
+            group=group,
+            permission=Permission.objects.get(codename='change_group'),
+            content_type=ContentType.objects.get_for_model(obj),
+            object_pk=str(obj.pk),
+        )
+
+    def get_changeable(self, user):
+        return list(filter_queryset_by_perm(
+            user,
+            'auth.change_group',
+            Group.objects.order_by('name'),
+        ))
+
+    def test_user_grant(self):
+        with schema_context('test'):
+            self.grant(self.granted, user=self.user)
+            user = self.reload(self.user)
+            self.assertTrue(user.has_perm('auth.change_group', self.granted))
+            self.assertFalse(
+                user.has_perm('auth.change_group', self.other_group),
+            )
+            self.assertFalse(user.has_perm('auth.delete_group', self.granted))
+            # Object grants don't grant the permission on the model.
+            self.assertFalse(user.has_perm('auth.change_group'))
+            self.assertEqual(self.get_changeable(user), [self.granted])
+
+    def test_group_grant(self):
+        with schema_context('test'):
+            self.grant(self.granted, group=self.other_group)
+            self.user.tenant_permissions.groups.add(self.other_group)
+            user = self.reload(self.user)
+            self.assertTrue(user.has_perm('auth.change_group', self.granted))
+            self.assertEqual(self.get_changeable(user), [self.granted])
+
+    def test_no_grant(self):
+        with schema_context('test'):
+            user = self.reload(self.user)
+            self.assertFalse(user.has_perm('auth.change_group', self.granted))
+            self.assertEqual(self.get_changeable(user), [])
+
+    def test_superuser(self):
+        with schema_context('test'):
+            permissions = self.user.tenant_permissions
+            permissions.is_superuser = True
+            permissions.save()
+            user = self.reload(self.user)
+            self.assertTrue(user.has_perm('auth.change_group', self.granted))
+            self.assertEqual(
+                self.get_changeable(user),
+                [self.granted, self.other_group],
+            )
+
+    def test_inactive_user(self):
+        with schema_context('test'):
+            self.grant(self.granted, user=self.user)
+            user = self.reload(self.user)
+            user.is_active = False
+            self.assertFalse(user.has_perm('auth.change_group', self.granted))
+            self.assertEqual(self.get_changeable(user), [])
+
+    def test_grants_are_per_tenant(self):
+        with schema_context('test'):
+            self.grant(self.granted, user=self.user)
+        with schema_context('other'):
+            group = Group.objects.create(pk=self.granted.pk, name='Editors')
+            user = self.reload(self.user)
+            self.assertFalse(user.has_perm('auth.change_group', group))
+            self.assertEqual(self.get_changeable(user), [])
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import AnonymousUser, Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.test import override_settings
+
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.querysets import PermissionQuerySet
+from multi_tenant_users.utils import add_user
+
+from .base import TenantsTestCase
+from .permissions.models import ObjectPermission
+
+
+class VisibleToTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        add_user(self.user, self.tenant)
+        add_user(self.user, self.other)
+        with schema_context('test'):
+            self.editors = Group.objects.create(name='Editors')
+            self.viewers = Group.objects.create(name='Viewers')
+            self.view_group = Permission.objects.get(codename='view_group')
+
+    def get_visible(self, user):
+        return list(
+            PermissionQuerySet(Group)
+            .visible_to(user, 'auth.view_group')
+            .order_by('name')
+        )
+
+    def test_no_permission(self):
+        with schema_context('test'):
+            self.assertEqual(self.get_visible(self.reload(self.user)), [])
+
+    def test_direct_permission(self):
+        with schema_context('test'):
+            self.user.tenant_permissions.user_permissions.add(self.view_group)
+            self.assertEqual(
+                self.get_visible(self.reload(self.user)),
+                [self.editors, self.viewers],
+            )
+
+    def test_group_permission(self):
+        with schema_context('test'):
+            self.viewers.permissions.add(self.view_group)
+            self.user.tenant_permissions.groups.add(self.viewers)
+            self.assertEqual(
+                self.get_visible(self.reload(self.user)),
+                [self.editors, self.viewers],
+            )
+
+    def test_superuser(self):
+        with schema_context('test'):
+            permissions = self.user.tenant_permissions
+            permissions.is_superuser = True
+            permissions.save()
+            self.assertEqual(
+                self.get_visible(self.reload(self.user)),
+                [self.editors, self.viewers],
+            )
+
+    @override_settings(
+        MULTI_TENANT_USERS_OBJECT_PERMISSIONS_MODEL=(
+            'permissions.ObjectPermission'
+        ),
+    )
+    def test_object_permission(self):
+        with schema_context('test'):
+            ObjectPermission.objects.create(
+                user=self.user,
+                permission=self.view_group,
+                content_type=ContentType.objects.get_for_model(Group),
+                object_pk=str(self.viewers.pk),
+            )
+            self.assertEqual(
+                self.get_visible(self.reload(self.user)),
+                [self.viewers],
+            )
+
+    def test_inactive_and_anonymous_users(self):
+        with schema_context('test'):
+            self.user.tenant_permissions.user_permissions.add(self.view_group)
+            user = self.reload(self.user)
+            user.is_active = False
+            self.assertEqual(self.get_visible(user), [])
+            self.assertEqual(self.get_visible(AnonymousUser()), [])
+
+    def test_permissions_are_per_tenant(self):
+        with schema_context('test'):
+            self.user.tenant_permissions.user_permissions.add(self.view_group)
+        with schema_context('other'):
+            Group.objects.create(name='Editors')
+            self.assertEqual(self.get_visible(self.reload(self.user)), [])
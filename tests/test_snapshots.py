@@ -0,0 +1,101 @@
+from django.contrib.auth.models import Permission
+from django.test import override_settings
+
+from multi_tenant_users.cache import get_permissions_version
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.snapshots import (
+    SESSION_KEY,
+    restore_snapshot,
+    save_snapshot,
+)
+from multi_tenant_users.utils import add_user
+
+from .base import TenantsTestCase
+
+
+@override_settings(MULTI_TENANT_USERS_PERMISSIONS_CACHE='default')
+class SnapshotTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        add_user(self.user, self.tenant)
+        add_user(self.user, self.other)
+        with schema_context('test'):
+            self.user.tenant_permissions.user_permissions.add(
+                Permission.objects.get(codename='add_group'),
+            )
+        self.session = {}
+
+    def save(self, schema_name='test'):
+        with schema_context(schema_name):
+            user = self.reload(self.user)
+            user.has_perm('auth.add_group')
+            return save_snapshot(
+                self.session,
+                user,
+                schema_name,
+                get_permissions_version(schema_name),
+            )
+
+    def restore(self, user, schema_name='test'):
+        return restore_snapshot(
+            self.session,
+            user,
+            schema_name,
+            get_permissions_version(schema_name),
+        )
+
+    def test_restores_permissions_without_queries(self):
+        self.assertTrue(self.save())
+        user = self.reload(self.user)
+        with schema_context('test'):
+            self.assertTrue(self.restore(user))
+            with self.assertNumQueries(0):
+                self.assertTrue(user.has_perm('auth.add_group'))
+                self.assertFalse(user.has_perm('auth.delete_group'))
+                self.assertFalse(user.is_superuser)
+
+    @override_settings(MULTI_TENANT_USERS_PERMISSION_BITMAPS=True)
+    def test_restores_permission_bitmaps(self):
+        self.assertTrue(self.save())
+        user = self.reload(self.user)
+        with schema_context('test'):
+            self.assertTrue(self.restore(user))
+            with self.assertNumQueries(0):
+                self.assertTrue(user.has_perm('auth.add_group'))
+                self.assertFalse(user.has_perm('auth.delete_group'))
+
+    def test_unchanged_snapshot_is_not_saved_again(self):
+        self.assertTrue(self.save())
+        self.assertFalse(self.save())
+
+    def test_snapshots_are_per_tenant(self):
+        self.assertTrue(self.save('test'))
+        self.assertTrue(self.save('other'))
+        user = self.reload(self.user)
+        with schema_context('other'):
+            self.assertTrue(self.restore(user, 'other'))
+            self.assertFalse(user.has_perm('auth.add_group'))
+
+    def test_permission_changes_invalidate_snapshot(self):
+        self.assertTrue(self.save())
+        with schema_context('test'):
+            permissions = self.reload(self.user).tenant_permissions
+            with self.capture_on_commit_callbacks(execute=True):
+                permissions.user_permissions.clear()
+            user = self.reload(self.user)
+            self.assertFalse(self.restore(user))
+            self.assertFalse(user.has_perm('auth.add_group'))
+
+    def test_rejects_snapshot_of_other_user(self):
+        self.assertTrue(self.save())
+        other_user = self.create_user('bob')
+        add_user(other_user, self.tenant)
+        with schema_context('test'):
+            self.assertFalse(self.restore(other_user))
+
+    def test_rejects_tampered_snapshot(self):
+        self.assertTrue(self.save())
+        self.session[SESSION_KEY]['test'] += 'x'
+        with schema_context('test'):
+            self.assertFalse(self.restore(self.reload(self.user)))
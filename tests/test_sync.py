@@ -0,0 +1,119 @@
+from django.contrib.auth.models import Group, Permission
+from django.test import override_settings
+
+from multi_tenant_users.cache import get_permissions_version
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.utils import (
+    bulk_add_users,
+    sync_tenant_groups,
+    sync_tenant_user_permissions,
+)
+
+from .base import TenantsTestCase
+
+
+@override_settings(MULTI_TENANT_USERS_PERMISSIONS_CACHE='default')
+class SyncTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [self.create_user('user%d' % i) for i in range(3)]
+        self.user_ids = [user.pk for user in self.users]
+        bulk_add_users(self.users[:2], self.tenant)
+        with schema_context('test'):
+            self.groups = [
+                Group.objects.create(name='group%d' % i) for i in range(3)
+            ]
+        self.group_ids = [group.pk for group in self.groups]
+
+    def get_groups(self):
+        with schema_context('test'):
+            return {
+                user.pk: sorted(
+                    self.reload(user).tenant_permissions.groups
+                    .values_list('pk', flat=True)
+                )
+                for user in self.users[:2]
+            }
+
+    def test_sync_tenant_groups(self):
+        first, second, third = self.user_ids
+        result = sync_tenant_groups(
+            {
+                first: self.groups[:1],
+                second: self.group_ids[:2],
+                third: self.group_ids,
+            },
+            self.tenant,
+        )
+        self.assertEqual(result.added, {
+            first: self.group_ids[:1],
+            second: self.group_ids[:2],
+        })
+        self.assertEqual(result.removed, {})
+        self.assertEqual(result.missing, [third])
+
+        result = sync_tenant_groups(
+            {first: self.group_ids[1:], second: self.group_ids[:2]},
+            self.tenant,
+            batch_size=1,
+        )
+        self.assertEqual(result.added, {first: self.group_ids[1:]})
+        self.assertEqual(result.removed, {first: self.group_ids[:1]})
+        self.assertEqual(result.missing, [])
+        self.assertEqual(self.get_groups(), {
+            first: self.group_ids[1:],
+            second: self.group_ids[:2],
+        })
+
+    def test_sync_in_current_tenant(self):
+        with schema_context('test'):
+            sync_tenant_groups({self.user_ids[0]: self.group_ids[:1]})
+        self.assertEqual(
+            self.get_groups()[self.user_ids[0]],
+            self.group_ids[:1],
+        )
+
+    def test_unchanged_assignments(self):
+        sync_tenant_groups({self.user_ids[0]: self.group_ids}, self.tenant)
+        version = get_permissions_version('test')
+        with self.capture_on_commit_callbacks(execute=True):
+            result = sync_tenant_groups(
+                {self.user_ids[0]: self.group_ids},
+                self.tenant,
+            )
+        self.assertEqual(result.added, {})
+        self.assertEqual(result.removed, {})
+        self.assertEqual(get_permissions_version('test'), version)
+
+    def test_sync_tenant_user_permissions(self):
+        with schema_context('test'):
+            add_group, change_group = Permission.objects.filter(
+                codename__in=['add_group', 'change_group'],
+            ).order_by('pk')
+            user = self.reload(self.users[0])
+            self.assertFalse(user.has_perm('auth.add_group'))
+
+        with self.capture_on_commit_callbacks(execute=True):
+            result = sync_tenant_user_permissions(
+                {self.user_ids[0]: [add_group, change_group.pk]},
+                self.tenant,
+            )
+        self.assertEqual(result.added, {
+            self.user_ids[0]: [add_group.pk, change_group.pk],
+        })
+        # The cached permission sets are invalidated.
+        with schema_context('test'):
+            user = self.reload(self.users[0])
+            self.assertTrue(user.has_perm('auth.add_group'))
+            self.assertTrue(user.has_perm('auth.change_group'))
+
+        with self.capture_on_commit_callbacks(execute=True):
+            result = sync_tenant_user_permissions(
+                {self.user_ids[0]: [change_group]},
+                self.tenant,
+            )
+        self.assertEqual(result.removed, {self.user_ids[0]: [add_group.pk]})
+        with schema_context('test'):
+            user = self.reload(self.users[0])
+            self.assertFalse(user.has_perm('auth.add_group'))
+            self.assertTrue(user.has_perm('auth.change_group'))
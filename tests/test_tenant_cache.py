@@ -0,0 +1,52 @@
+from django.core.cache import cache
+
+from multi_tenant_users.compat import schema_context
+from multi_tenant_users.tenant_cache import get_tenant_cache
+
+from .base import TenantsTestCase
+
+
+class TenantCacheTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = get_tenant_cache('default')
+
+    def test_keys_are_namespaced_by_schema(self):
+        with schema_context('test'):
+            self.cache.set('report', 'test report')
+        with schema_context('other'):
+            self.assertIsNone(self.cache.get('report'))
+            self.cache.set('report', 'other report')
+        self.assertEqual(
+            self.cache.get('report', schema_name='test'),
+            'test report',
+        )
+        self.assertIsNone(cache.get('report'))
+
+    def test_invalidate_hides_stale_entries(self):
+        with schema_context('test'):
+            self.cache.set_many({'report': 'stale', 'summary': 'stale'})
+            generation = self.cache.get_generation()
+            self.cache.invalidate()
+            self.assertEqual(self.cache.get_generation(), generation + 1)
+            self.assertIsNone(self.cache.get('report'))
+            self.assertEqual(self.cache.get_many(['report', 'summary']), {})
+            self.cache.set('report', 'fresh')
+            self.assertEqual(self.cache.get('report'), 'fresh')
+
+    def test_invalidate_keeps_other_schemas(self):
+        self.cache.set('report', 'other report', schema_name='other')
+        self.cache.invalidate('test')
+        self.assertEqual(
+            self.cache.get('report', schema_name='other'),
+            'other report',
+        )
+
+    def test_invalidate_after_eviction(self):
+        with schema_context('test'):
+            self.cache.set('report', 'stale')
+            # The generation starts over after its key is evicted.
+            cache.clear()
+            self.cache.set('report', 'stale')
+            self.cache.invalidate()
+            self.assertIsNone(self.cache.get('report'))
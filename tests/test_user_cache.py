@@ -0,0 +1,59 @@
+from django.test import override_settings
+
+from multi_tenant_users.backends import ModelBackend
+from multi_tenant_users.cache import (
+    get_cached_user,
+    get_user_version,
+    set_cached_user,
+)
+
+from .base import TenantsTestCase
+
+
+@override_settings(MULTI_TENANT_USERS_USER_CACHE='default')
+class UserCacheTests(TenantsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('alice')
+        self.backend = ModelBackend()
+
+    def test_get_user_caches_user(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_cached_user(
+                self.user.pk,
+                self.user.get_session_auth_hash(),
+            )
+            self.assertEqual(user.username, 'alice')
+
+    def test_session_auth_hash_must_match(self):
+        self.backend.get_user(self.user.pk)
+        self.assertIsNone(self.backend.get_cached_user(self.user.pk, 'other'))
+
+    def test_saving_invalidates_after_commit(self):
+        self.backend.get_user(self.user.pk)
+        self.user.username = 'bob'
+        with self.capture_on_commit_callbacks() as callbacks:
+            self.user.save()
+        self.assertIsNotNone(get_cached_user(self.user.pk))
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(get_cached_user(self.user.pk))
+        self.assertEqual(self.backend.get_user(self.user.pk).username, 'bob')
+
+    def test_users_cached_before_commit_are_not_served(self):
+        version = get_user_version(self.user.pk)
+        session_auth_hash = self.user.get_session_auth_hash()
+        self.user.username = 'bob'
+        with self.capture_on_commit_callbacks(execute=True):
+            self.user.save()
+        # A request that loaded the user before the change committed caches
+        # them afterwards.
+        set_cached_user(self.user.pk, version, session_auth_hash, {
+            'id': self.user.pk,
+            'username': 'alice',
+        })
+        self.assertIsNone(
+            self.backend.get_cached_user(self.user.pk, session_auth_hash),
+        )
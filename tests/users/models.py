@@ -0,0 +1,15 @@
+from django.db import models
+from django_tenants.models import DomainMixin, TenantMixin
+from multi_tenant_users.users import AbstractUserMixin, TenantUser
+
+
+class Tenant(TenantMixin):
+    name = models.CharField(max_length=100)
+
+
+class Domain(DomainMixin):
+    pass
+
+
+class User(TenantUser, AbstractUserMixin):
+    pass